@@ -0,0 +1,60 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.core.config import settings
+from app.core.database import Base
+# Импортируем модели, чтобы autogenerate видел все таблицы
+from app.models import product, gallery, project, certificate, page_content, application, media, upload_session, pending_deletion, category_count, data_version
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+target_metadata = Base.metadata
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Для autogenerate: не трогаем таблицы, которых нет в моделях (остались от database_schema.sql),
+    и индексы, объявленные только для другой СУБД (GIN-индексы PostgreSQL на SQLite)
+    """
+    if type_ == "table" and reflected and compare_to is None:
+        return False
+    if type_ == "index" and not reflected:
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if ddl_if is not None and ddl_if.dialect is not None and ddl_if.dialect != context.get_context().dialect.name:
+            return False
+    return True
+
+def run_migrations_offline():
+    """Генерация SQL без подключения к базе (alembic upgrade head --sql)"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        # SQLite не умеет большинство ALTER TABLE: batch-режим пересоздает таблицу
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          render_as_batch=True, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
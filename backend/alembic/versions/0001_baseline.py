@@ -0,0 +1,223 @@
+"""Исходная схема
+
+Создает таблицы, которых нет, а в уже существующих (созданных create_all,
+init_db.py или прежними скриптами миграции) добавляет недостающие колонки и индексы.
+После нее базы в любом из прежних состояний приходят к одной схеме.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.types import JSONType
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    ]
+
+def _gin(table, column):
+    """GIN-индекс для фильтров по JSON (только PostgreSQL)"""
+    return dict(name=f"ix_{table}_{column}_gin", columns=[column], dialect="postgresql",
+                kw=dict(postgresql_using="gin", postgresql_ops={column: "jsonb_path_ops"}))
+
+def _index(table, *columns, unique=False):
+    return dict(name=f"ix_{table}_{columns[0]}", columns=list(columns), unique=unique)
+
+TABLES = {
+    "products": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("category", sa.String(100), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("features", JSONType()),
+            sa.Column("image_path", sa.String(500)),
+            sa.Column("thumbnail_path", sa.String(500)),
+            sa.Column("image_variants", JSONType()),
+            sa.Column("images", JSONType()),
+            sa.Column("specifications", JSONType(empty=None)),
+            sa.Column("detailed", JSONType(empty=None)),
+            sa.Column("price", sa.Float()),
+            sa.Column("status", sa.String(20)),
+            *_timestamps(),
+        ],
+        [_index("products", "id"), _index("products", "name"), _index("products", "category"),
+         _index("products", "status"), _gin("products", "features"), _gin("products", "specifications")],
+    ),
+    "gallery": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("category", sa.String(100), nullable=False),
+            sa.Column("color", sa.String(100)),
+            sa.Column("finish", sa.String(100)),
+            sa.Column("image_path", sa.String(500)),
+            sa.Column("thumbnail_path", sa.String(500)),
+            sa.Column("image_variants", JSONType()),
+            sa.Column("features", JSONType()),
+            sa.Column("status", sa.String(20)),
+            sa.Column("sort_order", sa.Integer()),
+            *_timestamps(),
+        ],
+        [_index("gallery", "id"), _index("gallery", "title"), _index("gallery", "category"),
+         _index("gallery", "status"), _gin("gallery", "features")],
+    ),
+    "projects": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("short_description", sa.String(500)),
+            sa.Column("category", sa.String(100), nullable=False),
+            sa.Column("client", sa.String(255)),
+            sa.Column("location", sa.String(255)),
+            sa.Column("area", sa.String(100)),
+            sa.Column("completion_date", sa.String(100)),
+            sa.Column("main_image_path", sa.String(500)),
+            sa.Column("thumbnail_path", sa.String(500)),
+            sa.Column("image_variants", JSONType()),
+            sa.Column("gallery_images", JSONType()),
+            sa.Column("gallery_image_variants", JSONType(empty=dict)),
+            sa.Column("features", JSONType()),
+            sa.Column("technologies", JSONType()),
+            sa.Column("status", sa.String(20)),
+            sa.Column("sort_order", sa.Integer()),
+            sa.Column("is_featured", sa.Boolean()),
+            *_timestamps(),
+        ],
+        [_index("projects", "id"), _index("projects", "title"), _index("projects", "category"),
+         _index("projects", "status"), _gin("projects", "features"), _gin("projects", "technologies")],
+    ),
+    "certificates": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("issuer", sa.String(200)),
+            sa.Column("issue_date", sa.DateTime()),
+            sa.Column("expiry_date", sa.DateTime()),
+            sa.Column("certificate_number", sa.String(100)),
+            sa.Column("image_path", sa.String(500)),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("category", sa.String(100)),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        ],
+        [_index("certificates", "id")],
+    ),
+    "page_content": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("page_name", sa.String(100), nullable=False),
+            sa.Column("title", sa.String(255)),
+            sa.Column("content", sa.Text()),
+            sa.Column("meta_description", sa.Text()),
+            sa.Column("updated_at", sa.DateTime()),
+        ],
+        [_index("page_content", "id"), _index("page_content", "page_name", unique=True)],
+    ),
+    "applications": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("company", sa.String(200), nullable=False),
+            sa.Column("phone", sa.String(20), nullable=False),
+            sa.Column("email", sa.String(100), nullable=False),
+            sa.Column("product_type", sa.Enum("PLATES", "TUBES", "PROFILES", "COATINGS", "OTHER", name="producttype"),
+                      nullable=False),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column("file_paths", sa.Text()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("status", sa.String(50)),
+        ],
+        [_index("applications", "id")],
+    ),
+    "media_blobs": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("sha256", sa.String(64), nullable=False),
+            sa.Column("path", sa.String(500), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("content_type", sa.String(100)),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("width", sa.Integer()),
+            sa.Column("height", sa.Integer()),
+            sa.Column("format", sa.String(10)),
+            sa.Column("placeholder", sa.Text()),
+            sa.Column("dominant_color", sa.String(7)),
+            *_timestamps(),
+        ],
+        [_index("media_blobs", "id"), _index("media_blobs", "sha256", unique=True),
+         _index("media_blobs", "path", unique=True)],
+    ),
+    "upload_sessions": (
+        [
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("filename", sa.String(255), nullable=False),
+            sa.Column("kind", sa.String(20), nullable=False),
+            sa.Column("total_size", sa.BigInteger(), nullable=False),
+            sa.Column("offset", sa.BigInteger(), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("file_path", sa.String(500)),
+            *_timestamps(),
+        ],
+        [_index("upload_sessions", "status")],
+    ),
+    "pending_deletions": (
+        [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("path", sa.String(500), nullable=False),
+            sa.Column("delete_after", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        ],
+        [_index("pending_deletions", "id"), _index("pending_deletions", "path"),
+         _index("pending_deletions", "delete_after")],
+    ),
+}
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    dialect = bind.dialect.name
+
+    for table, (columns, indexes) in TABLES.items():
+        if not inspector.has_table(table):
+            op.create_table(table, *columns)
+            existing_indexes = set()
+        else:
+            existing_columns = {column["name"] for column in inspector.get_columns(table)}
+            missing = [column for column in columns if column.name not in existing_columns]
+            if missing:
+                with op.batch_alter_table(table) as batch:
+                    for column in missing:
+                        batch.add_column(column.copy())
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table)}
+
+            # JSON-колонки, созданные на PostgreSQL строками, переводим в JSONB
+            if dialect == "postgresql":
+                types = {column["name"]: column["type"] for column in inspector.get_columns(table)}
+                for column in columns:
+                    if isinstance(column.type, JSONType) and column.name in existing_columns \
+                            and types[column.name].__class__.__name__ != "JSONB":
+                        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column.name} TYPE JSONB "
+                                   f"USING NULLIF({column.name}, '')::jsonb")
+
+        for index in indexes:
+            if index["name"] in existing_indexes or index.get("dialect", dialect) != dialect:
+                continue
+            op.create_index(index["name"], table, index["columns"], unique=index.get("unique", False),
+                            **index.get("kw", {}))
+
+def downgrade():
+    # upgrade() принимает и уже существующие таблицы с данными (create_all, init_db.py),
+    # поэтому откат удалил бы рабочие данные. Вернуть прежнее состояние можно только из резервной копии
+    raise RuntimeError("Откат исходной миграции 0001 не поддерживается: восстановите базу из резервной копии")
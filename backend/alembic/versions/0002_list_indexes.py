@@ -0,0 +1,44 @@
+"""Составные индексы под фильтры и сортировку списков
+
+Списки фильтруются по status/category и сортируются по sort_order, created_at —
+без этих индексов база сортирует каждую выборку в памяти.
+На PostgreSQL индексы строятся CONCURRENTLY, не блокируя запись в таблицы.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_gallery_list", "gallery", ["status", "category", "sort_order", "created_at"]),
+    ("ix_projects_list", "projects", ["status", "category", "sort_order", "created_at"]),
+    ("ix_products_list", "products", ["status", "category", "created_at"]),
+    ("ix_applications_status_created_at", "applications", ["status", "created_at"]),
+]
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    # Индексы могли уже появиться через create_all
+    missing = [(name, table, columns) for name, table, columns in INDEXES
+               if name not in {index["name"] for index in inspector.get_indexes(table)}]
+
+    if bind.dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns in missing:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+    else:
+        for name, table, columns in missing:
+            op.create_index(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,33 @@
+"""Инкрементальная очистка SQLite
+
+Переводит базу SQLite в auto_vacuum=INCREMENTAL: после удаления записей освободившиеся
+страницы возвращаются системе периодическим PRAGMA incremental_vacuum (app/core/database.py)
+без полного VACUUM. Режим меняется только через VACUUM, поэтому он выполняется один раз здесь.
+На других СУБД миграция ничего не делает.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def _set_auto_vacuum(mode: int):
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or bind.execute(sa.text("PRAGMA auto_vacuum")).scalar() == mode:
+        return
+    # VACUUM нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.execute(f"PRAGMA auto_vacuum={mode}")
+        op.execute("VACUUM")
+
+def upgrade():
+    _set_auto_vacuum(2)  # INCREMENTAL
+
+def downgrade():
+    _set_auto_vacuum(0)  # NONE
@@ -0,0 +1,142 @@
+"""Полнотекстовый поиск
+
+Общий индекс по продуктам, галерее и проектам (app/services/search.py):
+- SQLite: таблица FTS5 search_index; rowid = id * 3 + код типа, чтобы триггеры
+  обновляли строку по первичному ключу, а не перебором индекса;
+- PostgreSQL: таблица search_documents с tsvector (конфигурация russian) и GIN-индексом.
+Индекс заполняется здесь и дальше поддерживается триггерами в той же транзакции,
+что и изменение записи.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (таблица, тип, код типа, колонка названия, текстовые колонки, JSON-массивы)
+SOURCES = [
+    ("products", "product", 0, "name", [], ["features"]),
+    ("gallery", "gallery", 1, "title", ["color", "finish"], ["features"]),
+    ("projects", "project", 2, "title", ["short_description"], ["features", "technologies"]),
+]
+
+def _watched(title, text_columns, json_columns):
+    return ", ".join([title, "description", "status", *text_columns, *json_columns])
+
+def _sqlite_extra(row, text_columns, json_columns):
+    parts = [f"coalesce({row}.{column}, '')" for column in text_columns]
+    parts += [
+        f"coalesce((SELECT group_concat(value, ' ') FROM json_each("
+        f"CASE WHEN json_valid({row}.{column}) THEN {row}.{column} END)), '')"
+        for column in json_columns
+    ]
+    return " || ' ' || ".join(parts)
+
+def _sqlite_values(row, entity_type, code, title, text_columns, json_columns):
+    return (f"{row}.id * 3 + {code}, '{entity_type}', {row}.id, {row}.status, coalesce({row}.{title}, ''), "
+            f"coalesce({row}.description, ''), {_sqlite_extra(row, text_columns, json_columns)}")
+
+def _postgres_extra(row, text_columns, json_columns):
+    parts = [f"{row}.{column}" for column in text_columns]
+    parts += [
+        f"(SELECT string_agg(value, ' ') FROM jsonb_array_elements_text("
+        f"CASE WHEN jsonb_typeof({row}.{column}) = 'array' THEN {row}.{column} END))"
+        for column in json_columns
+    ]
+    return f"concat_ws(' ', {', '.join(parts)})"
+
+def _upgrade_sqlite():
+    op.execute(
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "entity_type UNINDEXED, entity_id UNINDEXED, status UNINDEXED, title, description, extra, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    columns = "rowid, entity_type, entity_id, status, title, description, extra"
+    for table, entity_type, code, title, text_columns, json_columns in SOURCES:
+        values = lambda row: _sqlite_values(row, entity_type, code, title, text_columns, json_columns)
+        op.execute(f"INSERT INTO search_index ({columns}) SELECT {values(table)} FROM {table}")
+        op.execute(
+            f"CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_index ({columns}) VALUES ({values('new')}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_search_update AFTER UPDATE OF {_watched(title, text_columns, json_columns)} "
+            f"ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 3 + {code}; "
+            f"INSERT INTO search_index ({columns}) VALUES ({values('new')}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 3 + {code}; END"
+        )
+
+def _upgrade_postgres():
+    op.execute("""
+        CREATE TABLE search_documents (
+            entity_type VARCHAR(20) NOT NULL,
+            entity_id INTEGER NOT NULL,
+            status VARCHAR(20),
+            title TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            extra TEXT NOT NULL DEFAULT '',
+            document TSVECTOR GENERATED ALWAYS AS (
+                setweight(to_tsvector('russian', title), 'A') ||
+                setweight(to_tsvector('russian', description), 'B') ||
+                setweight(to_tsvector('russian', extra), 'C')
+            ) STORED,
+            PRIMARY KEY (entity_type, entity_id)
+        )
+    """)
+    op.execute("CREATE INDEX ix_search_documents_document ON search_documents USING gin (document)")
+
+    for table, entity_type, code, title, text_columns, json_columns in SOURCES:
+        op.execute(f"""
+            INSERT INTO search_documents (entity_type, entity_id, status, title, description, extra)
+            SELECT '{entity_type}', id, status, coalesce({title}, ''), coalesce(description, ''),
+                   {_postgres_extra(table, text_columns, json_columns)}
+            FROM {table}
+        """)
+        op.execute(f"""
+            CREATE FUNCTION {table}_search_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    DELETE FROM search_documents WHERE entity_type = '{entity_type}' AND entity_id = OLD.id;
+                    RETURN OLD;
+                END IF;
+                INSERT INTO search_documents (entity_type, entity_id, status, title, description, extra)
+                VALUES ('{entity_type}', NEW.id, NEW.status, coalesce(NEW.{title}, ''), coalesce(NEW.description, ''),
+                        {_postgres_extra('NEW', text_columns, json_columns)})
+                ON CONFLICT (entity_type, entity_id) DO UPDATE SET
+                    status = EXCLUDED.status, title = EXCLUDED.title,
+                    description = EXCLUDED.description, extra = EXCLUDED.extra;
+                RETURN NEW;
+            END
+            $$
+        """)
+        op.execute(
+            f"CREATE TRIGGER {table}_search AFTER INSERT OR DELETE OR UPDATE OF "
+            f"{_watched(title, text_columns, json_columns)} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_search_sync()"
+        )
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        _upgrade_postgres()
+    else:
+        _upgrade_sqlite()
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for table, *_ in SOURCES:
+        if postgres:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_search ON {table}")
+            op.execute(f"DROP FUNCTION IF EXISTS {table}_search_sync()")
+        else:
+            for action in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+    op.execute(f"DROP TABLE IF EXISTS {'search_documents' if postgres else 'search_index'}")
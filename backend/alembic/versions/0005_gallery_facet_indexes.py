@@ -0,0 +1,40 @@
+"""Индексы под фасеты галереи
+
+Галерея фильтруется и группируется по color и finish (GET /api/v1/gallery/facets);
+без индексов каждая выборка по ним читает всю таблицу.
+На PostgreSQL индексы строятся CONCURRENTLY, не блокируя запись в таблицу.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_gallery_color", "gallery", ["color"]),
+    ("ix_gallery_finish", "gallery", ["finish"]),
+]
+
+def upgrade():
+    bind = op.get_bind()
+    existing = {index["name"] for index in sa.inspect(bind).get_indexes("gallery")}
+    missing = [(name, table, columns) for name, table, columns in INDEXES if name not in existing]
+
+    if bind.dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns in missing:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+    else:
+        for name, table, columns in missing:
+            op.create_index(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
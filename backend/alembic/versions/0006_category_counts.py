@@ -0,0 +1,108 @@
+"""Счетчики категорий
+
+Таблица category_counts: количество продуктов, элементов галереи и проектов по категории и статусу.
+Списки категорий читают ее вместо GROUP BY по всей таблице. Счетчики заполняются здесь
+и дальше поддерживаются триггерами в той же транзакции, что и изменение записи;
+сверка и пересчет — check_counters.py.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# (таблица, тип записи)
+SOURCES = [
+    ("products", "product"),
+    ("gallery", "gallery"),
+    ("projects", "project"),
+]
+
+def _increment(entity_type, row):
+    return (f"INSERT INTO category_counts (entity_type, category, status, count) "
+            f"VALUES ('{entity_type}', {row}.category, coalesce({row}.status, ''), 1) "
+            f"ON CONFLICT (entity_type, category, status) DO UPDATE SET count = category_counts.count + 1")
+
+def _decrement(entity_type, row):
+    # Строки с нулем удаляются, чтобы таблица не росла от переименованных категорий
+    condition = (f"entity_type = '{entity_type}' AND category = {row}.category "
+                 f"AND status = coalesce({row}.status, '')")
+    return (f"UPDATE category_counts SET count = count - 1 WHERE {condition}; "
+            f"DELETE FROM category_counts WHERE {condition} AND count <= 0")
+
+def _upgrade_sqlite():
+    for table, entity_type in SOURCES:
+        op.execute(
+            f"CREATE TRIGGER {table}_counts_insert AFTER INSERT ON {table} BEGIN "
+            f"{_increment(entity_type, 'new')}; END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_counts_update AFTER UPDATE OF category, status ON {table} "
+            f"WHEN old.category IS NOT new.category OR old.status IS NOT new.status BEGIN "
+            f"{_decrement(entity_type, 'old')}; {_increment(entity_type, 'new')}; END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_counts_delete AFTER DELETE ON {table} BEGIN "
+            f"{_decrement(entity_type, 'old')}; END"
+        )
+
+def _upgrade_postgres():
+    for table, entity_type in SOURCES:
+        op.execute(f"""
+            CREATE FUNCTION {table}_counts_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND OLD.category IS NOT DISTINCT FROM NEW.category
+                        AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    {_decrement(entity_type, 'OLD')};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    {_increment(entity_type, 'NEW')};
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute(
+            f"CREATE TRIGGER {table}_counts AFTER INSERT OR DELETE OR UPDATE OF category, status ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_counts_sync()"
+        )
+
+def upgrade():
+    op.create_table(
+        "category_counts",
+        sa.Column("entity_type", sa.String(20), primary_key=True),
+        sa.Column("category", sa.String(100), primary_key=True),
+        sa.Column("status", sa.String(20), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    for table, entity_type in SOURCES:
+        op.execute(
+            f"INSERT INTO category_counts (entity_type, category, status, count) "
+            f"SELECT '{entity_type}', category, coalesce(status, ''), count(*) FROM {table} "
+            f"WHERE category IS NOT NULL GROUP BY category, coalesce(status, '')"
+        )
+
+    if op.get_bind().dialect.name == "postgresql":
+        _upgrade_postgres()
+    else:
+        _upgrade_sqlite()
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for table, _ in SOURCES:
+        if postgres:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_counts ON {table}")
+            op.execute(f"DROP FUNCTION IF EXISTS {table}_counts_sync()")
+        else:
+            for action in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_counts_{action}")
+    op.drop_table("category_counts")
@@ -0,0 +1,62 @@
+"""Компактный JSON в UTF-8
+
+Старый код сохранял JSON через json.dumps с ensure_ascii=True: кириллица хранилась как \\uXXXX
+и занимала в 2–3 раза больше места. Миграция перекодирует текстовые JSON-колонки тем же
+форматом, что пишет JSONType (orjson: UTF-8 без пробелов). Строки с некорректным JSON не трогаются.
+На PostgreSQL JSONB хранится в разобранном виде, поэтому там перекодируются только текстовые колонки.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import orjson
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (таблица, JSON-колонки типа JSONType, текстовые колонки с JSON)
+COLUMNS = [
+    ("products", ["features", "image_variants", "images", "specifications", "detailed"], []),
+    ("gallery", ["image_variants", "features"], []),
+    ("projects", ["image_variants", "gallery_images", "gallery_image_variants", "features", "technologies"], []),
+    ("applications", [], ["file_paths"]),
+]
+
+BATCH_SIZE = 500
+
+def _compact(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return orjson.dumps(orjson.loads(value)).decode()
+    except orjson.JSONDecodeError:
+        return value
+
+def upgrade():
+    bind = op.get_bind()
+    postgres = bind.dialect.name == "postgresql"
+    for table, json_columns, text_columns in COLUMNS:
+        columns = text_columns if postgres else json_columns + text_columns
+        if not columns:
+            continue
+        select = sa.text(f"SELECT id, {', '.join(columns)} FROM {table} WHERE id > :last ORDER BY id LIMIT :limit")
+        last = 0
+        while True:
+            rows = bind.execute(select, {"last": last, "limit": BATCH_SIZE}).all()
+            if not rows:
+                break
+            for row in rows:
+                compacted = {column: (value, _compact(value)) for column, value in zip(columns, row[1:])}
+                changed = {column: new for column, (old, new) in compacted.items() if new != old}
+                if changed:
+                    assignments = ", ".join(f"{column} = :{column}" for column in changed)
+                    bind.execute(sa.text(f"UPDATE {table} SET {assignments} WHERE id = :id"), {**changed, "id": row.id})
+            last = rows[-1].id
+
+def downgrade():
+    # Компактный JSON читается так же, как экранированный, возвращать прежний формат незачем
+    pass
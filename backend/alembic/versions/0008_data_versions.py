@@ -0,0 +1,73 @@
+"""Версии данных таблиц
+
+Таблица data_versions: по строке на таблицу, версия которой увеличивается триггером
+в той же транзакции при любом INSERT/UPDATE/DELETE. Из нее строятся ETag списков и записей
+(app/core/conditional.py): изменение от любого процесса — другого воркера, скрипта,
+фоновой задачи — сразу меняет ETag, даже если count(*) и max(updated_at) остались прежними.
+На SQLite триггеры срабатывают на каждую строку, на PostgreSQL — раз на оператор.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Таблицы, от которых зависят ответы списков и записей (media_blobs — image_meta изображений)
+TABLES = ["products", "gallery", "projects", "media_blobs"]
+
+def _bump(table):
+    return f"UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}'"
+
+def _upgrade_sqlite():
+    for table in TABLES:
+        for action in ("insert", "update", "delete"):
+            op.execute(
+                f"CREATE TRIGGER {table}_version_{action} AFTER {action.upper()} ON {table} BEGIN "
+                f"{_bump(table)}; END"
+            )
+
+def _upgrade_postgres():
+    op.execute("""
+        CREATE FUNCTION data_versions_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$
+    """)
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION data_versions_bump()"
+        )
+
+def upgrade():
+    data_versions = op.create_table(
+        "data_versions",
+        sa.Column("table_name", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(data_versions, [{"table_name": table, "version": 0} for table in TABLES])
+
+    if op.get_bind().dialect.name == "postgresql":
+        _upgrade_postgres()
+    else:
+        _upgrade_sqlite()
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for table in TABLES:
+        if postgres:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+        else:
+            for action in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{action}")
+    if postgres:
+        op.execute("DROP FUNCTION IF EXISTS data_versions_bump()")
+    op.drop_table("data_versions")
@@ -0,0 +1,86 @@
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from PIL import UnidentifiedImageError
+
+from app.core.staticfiles import REVALIDATE_CACHE, RangeFileResponse, not_modified
+from app.services.image_cache import ImageCache, get_image_cache
+
+router = APIRouter()
+
+UPLOADS_ROOT = os.path.realpath("uploads")
+
+IMAGE_MEDIA_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+class CachedFileResponse(FileResponse):
+    """Файл из кэша изображений: закрепление снимается, когда ответ отдан или оборван"""
+
+    def __init__(self, path: str, cache: ImageCache, **kwargs):
+        super().__init__(path, **kwargs)
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.cache.release(self.path)
+
+def resolve_upload(path: str) -> str:
+    """Путь к загруженному файлу; запрещает выход за пределы папки uploads"""
+    full_path = os.path.realpath(os.path.join(UPLOADS_ROOT, path))
+    if os.path.commonpath([full_path, UPLOADS_ROOT]) != UPLOADS_ROOT or not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="Файл не найден")
+    return full_path
+
+@router.get("/img/{path:path}")
+async def get_resized_image(
+    request: Request,
+    path: str,
+    w: Optional[int] = Query(None, ge=16, le=4000),
+    h: Optional[int] = Query(None, ge=16, le=4000),
+    fmt: str = Query("webp", pattern="^(jpeg|png|webp|avif)$"),
+    q: int = Query(80, ge=30, le=95),
+):
+    """Изображение из uploads, уменьшенное до w x h и перекодированное в fmt (результат кэшируется)"""
+    source = resolve_upload(path)
+    cache = get_image_cache()
+    try:
+        cached_path = await cache.get_or_render(source, w, h, fmt, q)
+    except (UnidentifiedImageError, OSError, KeyError, ValueError):
+        raise HTTPException(status_code=415, detail="Не удалось обработать изображение")
+
+    # Имя файла в кэше — хэш от исходника (с mtime) и параметров, поэтому годится как ETag
+    headers = {
+        "Cache-Control": REVALIDATE_CACHE,
+        "ETag": f'"{os.path.splitext(os.path.basename(cached_path))[0]}"',
+    }
+    response = CachedFileResponse(cached_path, cache, media_type=IMAGE_MEDIA_TYPES[fmt], headers=headers)
+    if not_modified(response, request.headers):
+        cache.release(cached_path)
+        return Response(status_code=304, headers=headers)
+    return response
+
+@router.api_route("/media/{path:path}", methods=["GET", "HEAD"])
+async def get_media_file(request: Request, path: str):
+    """
+    Файл из uploads с поддержкой Range-запросов (перемотка видео без повторной загрузки).
+    Если сервер поддерживает zerocopysend, данные идут через sendfile.
+    """
+    full_path = resolve_upload(path)
+    response = RangeFileResponse(
+        full_path,
+        os.stat(full_path),
+        request.headers,
+        method=request.method,
+        headers={"Cache-Control": REVALIDATE_CACHE},
+    )
+    if response.status_code == 200 and not_modified(response, request.headers):
+        return Response(status_code=304, headers={"ETag": response.headers["etag"], "Cache-Control": REVALIDATE_CACHE})
+    return response
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1 import products, gallery, projects
+from app.api.v1 import products, gallery, projects, uploads, search
 
 api_router = APIRouter()
 
 api_router.include_router(products.router, prefix="/products", tags=["products"])
 api_router.include_router(gallery.router, prefix="/gallery", tags=["gallery"])
 api_router.include_router(projects.router, prefix="/projects", tags=["projects"])
+api_router.include_router(uploads.router, prefix="/uploads", tags=["uploads"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
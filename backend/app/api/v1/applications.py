@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-import json
 import os
 from datetime import datetime
 
 from app.core.database import get_db
+from app.core.types import json_dumps
 from app.models.application import Application, ProductType
 from app.core.config import settings
 from app.services.email_service import send_application_email
+from app.services.uploads import ingest_upload, sanitize_file
 
 router = APIRouter()
 
@@ -21,10 +23,24 @@ async def create_application(
     product_type: ProductType = Form(...),
     description: str = Form(...),
     files: Optional[List[UploadFile]] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создание новой заявки от клиента"""
     
+    # Сначала потоково принимаем файлы: при превышении размера заявка не создается
+    ingested_files = []
+    try:
+        for file in files or []:
+            if file.filename:
+                ingested = await ingest_upload(file)
+                ingested_files.append(ingested)
+                # Фото клиентов публикуются через /uploads: удаляем EXIF с геометками
+                await sanitize_file(ingested.tmp_path, ingested.content_type)
+    except BaseException:
+        for ingested in ingested_files:
+            ingested.discard()
+        raise
+    
     # Сохраняем заявку в БД
     application = Application(
         name=name,
@@ -37,26 +53,23 @@ async def create_application(
     )
     
     db.add(application)
-    db.commit()
-    db.refresh(application)
+    await db.commit()
+    await db.refresh(application)
     
     # Обрабатываем загруженные файлы
     file_paths = []
-    if files:
+    if ingested_files:
         upload_dir = f"uploads/applications/{application.id}"
         os.makedirs(upload_dir, exist_ok=True)
         
-        for file in files:
-            if file.filename:
-                file_path = f"{upload_dir}/{file.filename}"
-                with open(file_path, "wb") as buffer:
-                    content = await file.read()
-                    buffer.write(content)
-                file_paths.append(file_path)
+        for ingested in ingested_files:
+            file_path = f"{upload_dir}/{os.path.basename(ingested.filename)}"
+            os.replace(ingested.tmp_path, file_path)
+            file_paths.append(file_path)
         
         # Обновляем пути к файлам в БД
-        application.file_paths = json.dumps(file_paths)
-        db.commit()
+        application.file_paths = json_dumps(file_paths)
+        await db.commit()
     
     # Отправляем email уведомление
     try:
@@ -72,12 +85,12 @@ async def create_application(
     }
 
 @router.get("/applications/")
-def get_applications(
+async def get_applications(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение списка заявок (для внутреннего использования)"""
-    applications = db.query(Application).offset(skip).limit(limit).all()
-    return applications
+    applications = await db.scalars(select(Application).offset(skip).limit(limit))
+    return applications.all()
 
@@ -1,64 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import get_db
+from app.core.conditional import collection_etag, is_not_modified, not_modified, row_validators, set_validators
+from app.core.pagination import paginate
+from app.core.serialization import list_response
+from app.core.types import json_contains
 from app.models.gallery import Gallery as GalleryModel
-from app.schemas.gallery import GalleryCreate, GalleryUpdate, Gallery, GalleryList, GalleryCategory
+from app.schemas.gallery import GalleryCreate, GalleryUpdate, Gallery, GalleryList, GalleryFacets, GalleryCategory
+from app.services.counters import category_counts
+from app.services.facets import Facet, faceted_list
+from app.services.images import schedule_image
+from app.services.uploads import save_upload
+from app.services.storage import retain, release
 
 router = APIRouter()
 
+# Порядок списка; id в конце делает ключ уникальным для курсорной пагинации
+GALLERY_ORDER = [(GalleryModel.sort_order, False), (GalleryModel.created_at, True), (GalleryModel.id, False)]
+
+# Фильтры страницы галереи, по которым считаются количества
+GALLERY_FACETS = [
+    Facet("category", GalleryModel.category),
+    Facet("color", GalleryModel.color),
+    Facet("finish", GalleryModel.finish),
+    Facet("status", GalleryModel.status),
+]
+
 # Создаем папку для загрузок если её нет
 UPLOAD_DIR = "uploads/gallery"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.get("/", response_model=GalleryList)
 async def get_galleries(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    with_total: Optional[bool] = Query(None, description="считать ли общее количество (total)"),
     category: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    color: Optional[str] = None,
+    finish: Optional[str] = None,
+    feature: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить список элементов галереи с пагинацией и фильтрацией"""
-    query = db.query(GalleryModel)
+    query = select(GalleryModel)
     
     if category:
-        query = query.filter(GalleryModel.category == category)
+        query = query.where(GalleryModel.category == category)
     
     if status:
-        query = query.filter(GalleryModel.status == status)
-    
-    total = query.count()
-    galleries = query.order_by(GalleryModel.sort_order, GalleryModel.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return GalleryList(
-        galleries=galleries,
-        total=total,
-        page=skip // limit + 1,
-        size=limit
+        query = query.where(GalleryModel.status == status)
+    
+    if color:
+        query = query.where(GalleryModel.color == color)
+    
+    if finish:
+        query = query.where(GalleryModel.finish == finish)
+    
+    if feature:
+        query = query.where(json_contains(GalleryModel.features, feature))
+    
+    # If-None-Match проверяется по версиям таблиц, без загрузки и сериализации строк
+    etag = await collection_etag(db, GalleryModel)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # По умолчанию total считается только без курсора (как раньше); курсорным страницам он не нужен
+    if with_total is None:
+        with_total = cursor is None
+    page = await paginate(db, query, GALLERY_ORDER, limit, skip=skip, cursor=cursor, with_total=with_total)
+    
+    # Строки из базы кодируются сразу в JSON, без проверки каждой через схему GalleryList
+    response = list_response(
+        GalleryList, "galleries", page.items,
+        total=page.total,
+        total_estimated=page.total_estimated,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=page.next_cursor
     )
+    set_validators(response, etag)
+    return response
+
+@router.get("/facets", response_model=GalleryFacets)
+async def get_gallery_facets(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[List[str]] = Query(None),
+    color: Optional[List[str]] = Query(None),
+    finish: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Элементы галереи под выбранными фильтрами и количества по каждому значению
+    category, color, finish и status — одним запросом к базе.
+    Параметр можно повторять: ?color=Золотой&color=Бронзовый
+    """
+    selection = {"category": category, "color": color, "finish": finish, "status": status}
+    items, total, facets = await faceted_list(db, GalleryModel, GALLERY_FACETS, selection, GALLERY_ORDER,
+                                              limit, skip=skip)
+    
+    return GalleryFacets(galleries=items, total=total, facets=facets, page=skip // limit + 1, size=limit)
 
 @router.get("/categories", response_model=List[GalleryCategory])
-async def get_gallery_categories(db: Session = Depends(get_db)):
+async def get_gallery_categories(db: AsyncSession = Depends(get_db)):
     """Получить список категорий галереи с количеством элементов"""
-    categories = db.query(
-        GalleryModel.category,
-        func.count(GalleryModel.id).label('count')
-    ).filter(GalleryModel.status == "active").group_by(GalleryModel.category).all()
+    # Счетчики поддерживаются триггерами при каждой записи — полного прохода по таблице нет
+    categories = await category_counts(db, "gallery")
     
-    return [GalleryCategory(name=cat.category, count=cat.count) for cat in categories]
+    return [GalleryCategory(name=name, count=count) for name, count in categories]
 
 @router.get("/{gallery_id}", response_model=Gallery)
-async def get_gallery(gallery_id: int, db: Session = Depends(get_db)):
+async def get_gallery(gallery_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Получить конкретный элемент галереи по ID"""
-    gallery = db.query(GalleryModel).filter(GalleryModel.id == gallery_id).first()
-    if not gallery:
+    validators = await row_validators(db, GalleryModel, gallery_id)
+    if validators is None:
         raise HTTPException(status_code=404, detail="Элемент галереи не найден")
+    etag, last_modified = validators
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    gallery = await db.get(GalleryModel, gallery_id)
+    set_validators(response, etag, last_modified)
     return gallery
 
 @router.post("/", response_model=Gallery)
@@ -72,7 +142,7 @@ async def create_gallery(
     status: str = Form("active"),
     sort_order: int = Form(0),
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создать новый элемент галереи"""
     
@@ -88,14 +158,9 @@ async def create_gallery(
     # Сохраняем изображение
     image_path = None
     if image:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{image.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        image_path = f"uploads/gallery/{filename}"
+        blob = await save_upload(db, image, "image/")
+        image_path = blob.path
+        await retain(db, image_path)
     
     # Создаем элемент галереи
     gallery_data = {
@@ -112,8 +177,11 @@ async def create_gallery(
     
     gallery = GalleryModel(**gallery_data)
     db.add(gallery)
-    db.commit()
-    db.refresh(gallery)
+    await db.commit()
+    await db.refresh(gallery)
+    
+    # Миниатюра и адаптивные варианты создаются в фоне
+    schedule_image(GalleryModel, gallery.id, image_path)
     
     return gallery
 
@@ -121,10 +189,10 @@ async def create_gallery(
 async def update_gallery(
     gallery_id: int,
     gallery_update: GalleryUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновить элемент галереи"""
-    gallery = db.query(GalleryModel).filter(GalleryModel.id == gallery_id).first()
+    gallery = await db.get(GalleryModel, gallery_id)
     if not gallery:
         raise HTTPException(status_code=404, detail="Элемент галереи не найден")
     
@@ -132,25 +200,24 @@ async def update_gallery(
     for field, value in update_data.items():
         setattr(gallery, field, value)
     
-    gallery.updated_at = datetime.now()
-    db.commit()
-    db.refresh(gallery)
+    gallery.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    await db.refresh(gallery)
     
     return gallery
 
 @router.delete("/{gallery_id}")
-async def delete_gallery(gallery_id: int, db: Session = Depends(get_db)):
+async def delete_gallery(gallery_id: int, db: AsyncSession = Depends(get_db)):
     """Удалить элемент галереи"""
-    gallery = db.query(GalleryModel).filter(GalleryModel.id == gallery_id).first()
+    gallery = await db.get(GalleryModel, gallery_id)
     if not gallery:
         raise HTTPException(status_code=404, detail="Элемент галереи не найден")
     
-    # Удаляем изображение если есть
-    if gallery.image_path and os.path.exists(gallery.image_path):
-        os.remove(gallery.image_path)
+    # Удаляем изображение, если на него больше никто не ссылается
+    await release(db, gallery.image_path)
     
-    db.delete(gallery)
-    db.commit()
+    await db.delete(gallery)
+    await db.commit()
     
     return {"message": "Элемент галереи удален"}
 
@@ -158,27 +225,24 @@ async def delete_gallery(gallery_id: int, db: Session = Depends(get_db)):
 async def upload_gallery_image(
     gallery_id: int,
     image: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Загрузить изображение для элемента галереи"""
-    gallery = db.query(GalleryModel).filter(GalleryModel.id == gallery_id).first()
+    gallery = await db.get(GalleryModel, gallery_id)
     if not gallery:
         raise HTTPException(status_code=404, detail="Элемент галереи не найден")
     
-    # Удаляем старое изображение если есть
-    if gallery.image_path and os.path.exists(gallery.image_path):
-        os.remove(gallery.image_path)
-    
-    # Сохраняем новое изображение
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{gallery_id}_{timestamp}_{image.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    # Сохраняем новое изображение и освобождаем старое
+    blob = await save_upload(db, image, "image/")
+    await retain(db, blob.path)
+    await release(db, gallery.image_path)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    gallery.image_path = blob.path
+    gallery.thumbnail_path = None
+    gallery.image_variants = []
+    gallery.updated_at = datetime.now(timezone.utc)
+    await db.commit()
     
-    gallery.image_path = f"uploads/gallery/{filename}"
-    gallery.updated_at = datetime.now()
-    db.commit()
+    schedule_image(GalleryModel, gallery.id, gallery.image_path)
     
     return {"message": "Изображение загружено", "image_path": gallery.image_path}
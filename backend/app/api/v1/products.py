@@ -1,229 +1,235 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import get_db
+from app.core.conditional import collection_etag, is_not_modified, not_modified, row_validators, set_validators
+from app.core.pagination import paginate
+from app.core.serialization import list_response
+from app.core.types import json_contains
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema, ProductList
+from app.schemas.image import ImageMeta
 from app.core.config import settings
+from app.services.counters import category_counts
+from app.services.images import schedule_image
+from app.services.uploads import save_upload, save_uploads
+from app.services.storage import retain, release, retain_all, release_all
 
 router = APIRouter()
 
+# У продуктов нет sort_order: порядок как и раньше по id (его возвращала база без ORDER BY),
+# чтобы клиенты, листающие через skip, видели те же страницы; id уникален и годится для курсора
+PRODUCT_ORDER = [(Product.id, False)]
+
 # Создаем папку для загрузок, если её нет
 UPLOAD_DIR = "uploads/products"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.get("/", response_model=ProductList)
-def get_products(
-    skip: int = 0,
-    limit: int = 100,
+async def get_products(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    with_total: Optional[bool] = Query(None, description="считать ли общее количество (total)"),
     category: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    feature: Optional[str] = None,
+    color: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить список продуктов с фильтрацией"""
-    query = db.query(Product)
+    query = select(Product)
     
     if category:
-        query = query.filter(Product.category == category)
+        query = query.where(Product.category == category)
     if status:
-        query = query.filter(Product.status == status)
-    
-    total = query.count()
-    products = query.offset(skip).limit(limit).all()
-    
-    return ProductList(
-        products=products,
-        total=total,
-        page=skip // limit + 1,
-        size=limit
+        query = query.where(Product.status == status)
+    # Фильтры по JSON-полям выполняются в базе
+    if feature:
+        query = query.where(json_contains(Product.features, feature))
+    if color:
+        query = query.where(json_contains(Product.specifications, color, "colors"))
+    
+    # If-None-Match проверяется по версиям таблиц, без загрузки и сериализации строк
+    etag = await collection_etag(db, Product)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # По умолчанию total считается только без курсора (как раньше); курсорным страницам он не нужен
+    if with_total is None:
+        with_total = cursor is None
+    page = await paginate(db, query, PRODUCT_ORDER, limit, skip=skip, cursor=cursor, with_total=with_total)
+    
+    # Строки из базы кодируются сразу в JSON, без проверки каждой через схему ProductList
+    response = list_response(
+        ProductList, "products", page.items,
+        total=page.total,
+        total_estimated=page.total_estimated,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=page.next_cursor
     )
+    set_validators(response, etag)
+    return response
 
 @router.get("/{product_id}", response_model=ProductSchema)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Получить продукт по ID"""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    validators = await row_validators(db, Product, product_id)
+    if validators is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Продукт не найден"
         )
+    etag, last_modified = validators
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    product = await db.get(Product, product_id)
+    set_validators(response, etag, last_modified)
     return product
 
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
-def create_product(
+async def create_product(
     product: ProductCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создать новый продукт"""
-    # Преобразуем features в JSON строку
-    features_json = json.dumps(product.features) if product.features else None
-    specifications_json = json.dumps(product.specifications.dict()) if product.specifications else None
-    detailed_json = json.dumps(product.detailed.dict()) if product.detailed else None
-    images_json = json.dumps(product.images) if product.images else None
-    
     db_product = Product(
         name=product.name,
         category=product.category,
         description=product.description,
-        features=features_json,
+        features=product.features,
         image_path=product.image_path,
-        images=images_json,
-        specifications=specifications_json,
-        detailed=detailed_json,
+        images=product.images,
+        specifications=product.specifications.dict() if product.specifications else None,
+        detailed=product.detailed.dict() if product.detailed else None,
         price=product.price,
         status=product.status
     )
     
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    await retain(db, product.image_path)
+    await retain_all(db, product.images)
+    await db.commit()
+    await db.refresh(db_product)
+    
+    # Миниатюра и адаптивные варианты основного изображения создаются в фоне
+    schedule_image(Product, db_product.id, db_product.image_path)
     
     return db_product
 
 @router.put("/{product_id}", response_model=ProductSchema)
-def update_product(
+async def update_product(
     product_id: int,
     product_update: ProductUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновить продукт"""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
+    db_product = await db.get(Product, product_id)
     if not db_product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Продукт не найден"
         )
     
+    # Вложенные схемы превращаются в dict и сохраняются в JSON-колонки как есть
     update_data = product_update.dict(exclude_unset=True)
     
-    # Обрабатываем JSON поля отдельно
-    if "features" in update_data:
-        update_data["features"] = json.dumps(update_data["features"])
-    if "specifications" in update_data:
-        update_data["specifications"] = json.dumps(update_data["specifications"].dict())
-    if "detailed" in update_data:
-        update_data["detailed"] = json.dumps(update_data["detailed"].dict())
+    # При смене основного изображения старая миниатюра больше не актуальна
+    image_changed = "image_path" in update_data and update_data["image_path"] != db_product.image_path
+    if image_changed:
+        await retain(db, product_update.image_path)
+        await release(db, db_product.image_path)
+        db_product.thumbnail_path = None
+        db_product.image_variants = []
+    
     if "images" in update_data:
-        update_data["images"] = json.dumps(update_data["images"])
+        await retain_all(db, product_update.images)
+        await release_all(db, db_product.images)
     
     for field, value in update_data.items():
         setattr(db_product, field, value)
     
-    db_product.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_product)
+    db_product.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    await db.refresh(db_product)
+    
+    if image_changed:
+        schedule_image(Product, db_product.id, db_product.image_path)
     
     return db_product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
     """Удалить продукт"""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
+    db_product = await db.get(Product, product_id)
     if not db_product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Продукт не найден"
         )
     
-    # Удаляем изображения, если они есть
-    if db_product.image_path and os.path.exists(db_product.image_path):
-        try:
-            os.remove(db_product.image_path)
-        except OSError:
-            pass  # Игнорируем ошибки при удалении файла
-    
-    if db_product.images:
-        try:
-            images = json.loads(db_product.images)
-            for image_path in images:
-                if os.path.exists(image_path):
-                    try:
-                        os.remove(image_path)
-                    except OSError:
-                        pass
-        except (json.JSONDecodeError, TypeError):
-            pass
-    
-    db.delete(db_product)
-    db.commit()
+    # Удаляем изображения, на которые больше никто не ссылается
+    await release(db, db_product.image_path)
+    await release_all(db, db_product.images)
+    
+    await db.delete(db_product)
+    await db.commit()
 
 @router.post("/upload-image")
-async def upload_product_image(file: UploadFile = File(...)):
+async def upload_product_image(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     """Загрузить изображение для продукта"""
-    # Проверяем тип файла
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Файл должен быть изображением"
-        )
-    
-    # Проверяем размер файла (максимум 10MB)
-    if file.size and file.size > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Размер файла не должен превышать 10MB"
-        )
-    
-    # Генерируем уникальное имя файла
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"product_{timestamp}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    
-    # Сохраняем файл
+    # Файл читается потоком: тип определяется по содержимому, размер (максимум 10MB)
+    # проверяется во время чтения. Имя в хранилище — хэш содержимого.
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        blob = await save_upload(db, file, "image/")
+        await db.commit()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при сохранении файла: {str(e)}"
         )
     
-    return {"file_path": file_path, "filename": filename, "url": f"/uploads/products/{filename}"}
+    return {
+        "file_path": blob.path,
+        "filename": os.path.basename(blob.path),
+        "url": f"/{blob.path}",
+        "image_meta": ImageMeta.model_validate(blob)
+    }
 
 @router.post("/upload-multiple-images")
-async def upload_multiple_product_images(files: List[UploadFile] = File(...)):
+async def upload_multiple_product_images(files: List[UploadFile] = File(...), db: AsyncSession = Depends(get_db)):
     """Загрузить несколько изображений для продукта"""
-    uploaded_files = []
-    
-    for file in files:
-        # Проверяем тип файла
-        if not file.content_type.startswith('image/'):
-            continue  # Пропускаем не-изображения
-        
-        # Проверяем размер файла (максимум 10MB)
-        if file.size and file.size > 10 * 1024 * 1024:
-            continue  # Пропускаем слишком большие файлы
-        
-        # Генерируем уникальное имя файла
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"product_{timestamp}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        # Сохраняем файл
-        try:
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            uploaded_files.append({
-                "file_path": file_path,
-                "filename": filename,
-                "url": f"/uploads/products/{filename}"
-            })
-        except Exception as e:
-            continue  # Пропускаем файлы с ошибками
-    
-    return {"uploaded_files": uploaded_files, "count": len(uploaded_files)}
+    # Файлы сохраняются параллельно; не-изображения и слишком большие файлы пропускаются
+    results = await save_uploads(db, files, "image/")
+    await db.commit()
+    
+    uploaded_files = [
+        {
+            "file_path": result.blob.path,
+            "filename": os.path.basename(result.blob.path),
+            "url": f"/{result.blob.path}",
+            "image_meta": ImageMeta.model_validate(result.blob)
+        }
+        for result in results if result.ok
+    ]
+    
+    return {
+        "uploaded_files": uploaded_files,
+        "count": len(uploaded_files),
+        "results": [result.to_dict() for result in results]
+    }
 
 @router.get("/categories/list")
-def get_product_categories(db: Session = Depends(get_db)):
+async def get_product_categories(db: AsyncSession = Depends(get_db)):
     """Получить список всех категорий продуктов"""
-    categories = db.query(Product.category).distinct().all()
-    return [category[0] for category in categories]
+    categories = await category_counts(db, "product", status=None)
+    return [name for name, _ in categories]
 
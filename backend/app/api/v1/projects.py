@@ -1,17 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import get_db
+from app.core.conditional import collection_etag, is_not_modified, not_modified, row_validators, set_validators
+from app.core.pagination import paginate
+from app.core.serialization import list_response
+from app.core.types import json_contains
 from app.models.project import Project as ProjectModel
-from app.schemas.project import ProjectCreate, ProjectUpdate, Project, ProjectList, ProjectCategory
+from app.schemas.project import ProjectCreate, ProjectUpdate, Project, ProjectList, ProjectFacets, ProjectCategory
+from app.services.counters import category_counts
+from app.services.facets import Facet, faceted_list
+from app.services.images import schedule_image
+from app.services.uploads import save_upload, save_uploads
+from app.services.storage import retain, retain_all, release, release_all
 
 router = APIRouter()
 
+# Порядок списка; id в конце делает ключ уникальным для курсорной пагинации
+PROJECT_ORDER = [(ProjectModel.sort_order, False), (ProjectModel.created_at, True), (ProjectModel.id, False)]
+
+# Фильтры страницы проектов, по которым считаются количества
+PROJECT_FACETS = [
+    Facet("category", ProjectModel.category),
+    Facet("status", ProjectModel.status),
+    Facet("technologies", ProjectModel.technologies, array=True),
+]
+
 # Создаем папку для загрузок если её нет
 UPLOAD_DIR = "uploads/projects"
 GALLERY_DIR = "uploads/projects/gallery"
@@ -20,51 +38,98 @@ os.makedirs(GALLERY_DIR, exist_ok=True)
 
 @router.get("/", response_model=ProjectList)
 async def get_projects(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    with_total: Optional[bool] = Query(None, description="считать ли общее количество (total)"),
     category: Optional[str] = None,
     status: Optional[str] = None,
     featured: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    technology: Optional[str] = None,
+    feature: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить список проектов с пагинацией и фильтрацией"""
-    query = db.query(ProjectModel)
+    query = select(ProjectModel)
     
     if category:
-        query = query.filter(ProjectModel.category == category)
+        query = query.where(ProjectModel.category == category)
     
     if status:
-        query = query.filter(ProjectModel.status == status)
+        query = query.where(ProjectModel.status == status)
     
     if featured is not None:
-        query = query.filter(ProjectModel.is_featured == featured)
+        query = query.where(ProjectModel.is_featured == featured)
+    
+    # Фильтры по JSON-массивам выполняются в базе
+    if technology:
+        query = query.where(json_contains(ProjectModel.technologies, technology))
+    
+    if feature:
+        query = query.where(json_contains(ProjectModel.features, feature))
+    
+    # If-None-Match проверяется по версиям таблиц, без загрузки и сериализации строк
+    etag = await collection_etag(db, ProjectModel)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
     
-    total = query.count()
-    projects = query.order_by(ProjectModel.sort_order, ProjectModel.created_at.desc()).offset(skip).limit(limit).all()
+    # По умолчанию total считается только без курсора (как раньше); курсорным страницам он не нужен
+    if with_total is None:
+        with_total = cursor is None
+    page = await paginate(db, query, PROJECT_ORDER, limit, skip=skip, cursor=cursor, with_total=with_total)
     
-    return ProjectList(
-        projects=projects,
-        total=total,
-        page=skip // limit + 1,
-        size=limit
+    # Строки из базы кодируются сразу в JSON, без проверки каждой через схему ProjectList
+    response = list_response(
+        ProjectList, "projects", page.items,
+        total=page.total,
+        total_estimated=page.total_estimated,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=page.next_cursor
     )
+    set_validators(response, etag)
+    return response
+
+@router.get("/facets", response_model=ProjectFacets)
+async def get_project_facets(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    technology: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Проекты под выбранными фильтрами и количества по каждому значению
+    category, status и technologies — одним запросом к базе.
+    Параметр можно повторять: ?technology=PVD&technology=Лазерная резка
+    """
+    selection = {"category": category, "status": status, "technologies": technology}
+    items, total, facets = await faceted_list(db, ProjectModel, PROJECT_FACETS, selection, PROJECT_ORDER,
+                                              limit, skip=skip)
+    
+    return ProjectFacets(projects=items, total=total, facets=facets, page=skip // limit + 1, size=limit)
 
 @router.get("/categories", response_model=List[ProjectCategory])
-async def get_project_categories(db: Session = Depends(get_db)):
+async def get_project_categories(db: AsyncSession = Depends(get_db)):
     """Получить список категорий проектов с количеством элементов"""
-    categories = db.query(
-        ProjectModel.category,
-        func.count(ProjectModel.id).label('count')
-    ).filter(ProjectModel.status == "active").group_by(ProjectModel.category).all()
+    # Счетчики поддерживаются триггерами при каждой записи — полного прохода по таблице нет
+    categories = await category_counts(db, "project")
     
-    return [ProjectCategory(name=cat.category, count=cat.count) for cat in categories]
+    return [ProjectCategory(name=name, count=count) for name, count in categories]
 
 @router.get("/{project_id}", response_model=Project)
-async def get_project(project_id: int, db: Session = Depends(get_db)):
+async def get_project(project_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Получить конкретный проект по ID"""
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-    if not project:
+    validators = await row_validators(db, ProjectModel, project_id)
+    if validators is None:
         raise HTTPException(status_code=404, detail="Проект не найден")
+    etag, last_modified = validators
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    project = await db.get(ProjectModel, project_id)
+    set_validators(response, etag, last_modified)
     return project
 
 @router.post("/", response_model=Project)
@@ -84,7 +149,7 @@ async def create_project(
     is_featured: bool = Form(False),
     main_image: Optional[UploadFile] = File(None),
     gallery_images: Optional[List[UploadFile]] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создать новый проект"""
     
@@ -105,30 +170,17 @@ async def create_project(
         except:
             technologies_list = []
     
-    # Сохраняем главное изображение
-    main_image_path = None
-    if main_image:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"main_{timestamp}_{main_image.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(main_image.file, buffer)
-        
-        main_image_path = f"uploads/projects/{filename}"
-    
-    # Сохраняем изображения галереи
-    gallery_paths = []
-    if gallery_images:
-        for i, image in enumerate(gallery_images):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"gallery_{i}_{timestamp}_{image.filename}"
-            file_path = os.path.join(GALLERY_DIR, filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            gallery_paths.append(f"uploads/projects/gallery/{filename}")
+    # Сохраняем главное изображение и изображения галереи параллельно
+    results = await save_uploads(db, ([main_image] if main_image else []) + list(gallery_images or []), "image/")
+    failed = [result for result in results if not result.ok]
+    if failed:
+        raise HTTPException(status_code=400, detail=f"{failed[0].filename}: {failed[0].error}")
+    
+    paths = [result.blob.path for result in results]
+    main_image_path = paths.pop(0) if main_image else None
+    gallery_paths = paths
+    await retain(db, main_image_path)
+    await retain_all(db, gallery_paths)
     
     # Создаем проект
     project_data = {
@@ -151,8 +203,13 @@ async def create_project(
     
     project = ProjectModel(**project_data)
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
+    
+    # Миниатюры и адаптивные варианты изображений создаются в фоне
+    schedule_image(ProjectModel, project.id, main_image_path)
+    for image_path in gallery_paths:
+        schedule_image(ProjectModel, project.id, image_path)
     
     return project
 
@@ -160,10 +217,10 @@ async def create_project(
 async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновить проект"""
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
     
@@ -171,30 +228,25 @@ async def update_project(
     for field, value in update_data.items():
         setattr(project, field, value)
     
-    project.updated_at = datetime.now()
-    db.commit()
-    db.refresh(project)
+    project.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    await db.refresh(project)
     
     return project
 
 @router.delete("/{project_id}")
-async def delete_project(project_id: int, db: Session = Depends(get_db)):
+async def delete_project(project_id: int, db: AsyncSession = Depends(get_db)):
     """Удалить проект"""
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
     
-    # Удаляем изображения если есть
-    if project.main_image_path and os.path.exists(project.main_image_path):
-        os.remove(project.main_image_path)
-    
-    if project.gallery_images:
-        for image_path in project.gallery_images:
-            if os.path.exists(image_path):
-                os.remove(image_path)
+    # Удаляем изображения, на которые больше никто не ссылается
+    await release(db, project.main_image_path)
+    await release_all(db, project.gallery_images)
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
     
     return {"message": "Проект удален"}
 
@@ -202,28 +254,25 @@ async def delete_project(project_id: int, db: Session = Depends(get_db)):
 async def upload_project_main_image(
     project_id: int,
     image: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Загрузить главное изображение для проекта"""
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
     
-    # Удаляем старое изображение если есть
-    if project.main_image_path and os.path.exists(project.main_image_path):
-        os.remove(project.main_image_path)
+    # Сохраняем новое изображение и освобождаем старое
+    blob = await save_upload(db, image, "image/")
+    await retain(db, blob.path)
+    await release(db, project.main_image_path)
     
-    # Сохраняем новое изображение
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"main_{project_id}_{timestamp}_{image.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    project.main_image_path = blob.path
+    project.thumbnail_path = None
+    project.image_variants = []
+    project.updated_at = datetime.now(timezone.utc)
+    await db.commit()
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
-    
-    project.main_image_path = f"uploads/projects/{filename}"
-    project.updated_at = datetime.now()
-    db.commit()
+    schedule_image(ProjectModel, project.id, project.main_image_path)
     
     return {"message": "Главное изображение загружено", "image_path": project.main_image_path}
 
@@ -231,33 +280,33 @@ async def upload_project_main_image(
 async def upload_project_gallery_images(
     project_id: int,
     images: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Загрузить изображения галереи для проекта"""
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
     
-    # Удаляем старые изображения галереи если есть
-    if project.gallery_images:
-        for image_path in project.gallery_images:
-            if os.path.exists(image_path):
-                os.remove(image_path)
-    
-    # Сохраняем новые изображения
-    gallery_paths = []
-    for i, image in enumerate(images):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"gallery_{project_id}_{i}_{timestamp}_{image.filename}"
-        file_path = os.path.join(GALLERY_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        gallery_paths.append(f"uploads/projects/gallery/{filename}")
+    # Сохраняем новые изображения параллельно; ошибка одного файла не отменяет остальные
+    results = await save_uploads(db, images, "image/")
+    gallery_paths = [result.blob.path for result in results if result.ok]
+    if not gallery_paths:
+        raise HTTPException(status_code=400, detail="Не удалось загрузить ни одного изображения")
+    await retain_all(db, gallery_paths)
+    
+    # Освобождаем старые изображения галереи
+    await release_all(db, project.gallery_images)
     
     project.gallery_images = gallery_paths
-    project.updated_at = datetime.now()
-    db.commit()
+    project.gallery_image_variants = {}
+    project.updated_at = datetime.now(timezone.utc)
+    await db.commit()
     
-    return {"message": f"Загружено {len(images)} изображений галереи", "gallery_paths": gallery_paths}
+    for image_path in gallery_paths:
+        schedule_image(ProjectModel, project.id, image_path)
+    
+    return {
+        "message": f"Загружено {len(gallery_paths)} из {len(images)} изображений галереи",
+        "gallery_paths": gallery_paths,
+        "results": [result.to_dict() for result in results]
+    }
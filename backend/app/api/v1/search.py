@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core.database import get_db
+from app.schemas.search import SearchEntityType, SearchResponse
+from app.services.search import search
+
+router = APIRouter()
+
+@router.get("/", response_model=SearchResponse)
+async def search_catalog(
+    q: str = Query(..., min_length=2, max_length=200, description="поисковый запрос"),
+    types: Optional[List[SearchEntityType]] = Query(None, alias="type", description="искать только среди этих типов"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Полнотекстовый поиск по продуктам, галерее и проектам с учетом русской морфологии"""
+    selected = [entity_type.value for entity_type in types] if types else None
+    results, counts = await search(db, q, selected, limit=limit, skip=skip)
+    
+    return SearchResponse(
+        query=q,
+        results=results,
+        counts=counts,
+        total=sum(count for entity_type, count in counts.items() if selected is None or entity_type in selected),
+        page=skip // limit + 1,
+        size=limit
+    )
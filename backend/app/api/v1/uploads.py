@@ -0,0 +1,269 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response, status
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.project import Project as ProjectModel
+from app.models.upload_session import UploadSession as UploadSessionModel
+from app.schemas.upload import UploadSessionCreate, UploadSession, UploadFinalize
+from app.services.cleanup import RESUMABLE_DIR, part_path_for
+from app.services.images import schedule_image
+from app.services.storage import store_file, retain, release
+from app.services.uploads import run_io, sniff_content_type, hash_file, inspect_image, apply_image_info
+
+router = APIRouter()
+
+os.makedirs(RESUMABLE_DIR, exist_ok=True)
+
+CHUNK_MAX_BYTES = settings.UPLOAD_CHUNK_MB * 1024 * 1024
+
+# Через сколько занятая запросом сессия считается брошенной (процесс упал во время записи части)
+CHUNK_LEASE = timedelta(minutes=10)
+
+def _open_part(path: str, offset: int):
+    """Открывает файл частей для записи с offset, отбрасывая недописанный хвост прерванного запроса"""
+    part = open(path, "r+b")
+    part.truncate(offset)
+    part.seek(offset)
+    return part
+
+def _close_part(part, size: int):
+    part.truncate(size)
+    part.close()
+
+def _touch(path: str):
+    open(path, "wb").close()
+
+def _read_head(path: str, size: int = 32) -> bytes:
+    with open(path, "rb") as part:
+        return part.read(size)
+
+def _to_schema(session: UploadSessionModel) -> UploadSession:
+    return UploadSession.model_validate({
+        **{c.name: getattr(session, c.name) for c in session.__table__.columns},
+        "chunk_size": CHUNK_MAX_BYTES,
+    })
+
+async def _get_session(db: AsyncSession, session_id: str) -> UploadSessionModel:
+    session = await db.get(UploadSessionModel, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Сессия загрузки не найдена")
+    return session
+
+@router.post("/", response_model=UploadSession, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(data: UploadSessionCreate, db: AsyncSession = Depends(get_db)):
+    """Начать загрузку большого файла по частям"""
+    if data.total_size > settings.MAX_RESUMABLE_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Размер файла не должен превышать {settings.MAX_RESUMABLE_UPLOAD_MB}MB"
+        )
+
+    session = UploadSessionModel(
+        id=str(uuid.uuid4()),
+        filename=os.path.basename(data.filename),
+        kind=data.kind,
+        total_size=data.total_size,
+        offset=0,
+        status="pending"
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+
+    await run_io(_touch, part_path_for(session.id))
+    return _to_schema(session)
+
+@router.get("/{session_id}", response_model=UploadSession)
+async def get_upload_session(session_id: str, response: Response, db: AsyncSession = Depends(get_db)):
+    """Текущее состояние загрузки: с какого смещения продолжать"""
+    session = await _get_session(db, session_id)
+    response.headers["Upload-Offset"] = str(session.offset)
+    return _to_schema(session)
+
+@router.patch("/{session_id}", response_model=UploadSession)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Дописать часть файла с указанного смещения (тело запроса — байты части).
+    Каждая часть не больше UPLOAD_CHUNK_MB, поэтому запрос занимает воркер недолго.
+    """
+    session = await _get_session(db, session_id)
+    if session.status == "completed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Загрузка уже завершена")
+    if upload_offset != session.offset:
+        # Клиент должен продолжить с сохраненного смещения
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ожидается смещение {session.offset}",
+            headers={"Upload-Offset": str(session.offset)}
+        )
+
+    # Смещение занимается условным UPDATE до записи: из параллельных запросов с тем же смещением
+    # (повтор клиента, запрос к другому воркеру) часть пишет только один, остальные получают 409.
+    # Сессию, зависшую в "writing" после падения процесса, можно занять снова через CHUNK_LEASE
+    claimed = await db.execute(
+        update(UploadSessionModel)
+        .where(
+            UploadSessionModel.id == session_id,
+            UploadSessionModel.offset == upload_offset,
+            or_(UploadSessionModel.status == "pending",
+                and_(UploadSessionModel.status == "writing",
+                     UploadSessionModel.updated_at < datetime.now(timezone.utc) - CHUNK_LEASE))
+        )
+        .values(status="writing")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if claimed.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Часть с этого смещения уже загружается",
+            headers={"Upload-Offset": str(upload_offset)}
+        )
+
+    limit = min(CHUNK_MAX_BYTES, session.total_size - upload_offset)
+    received = 0
+    part = await run_io(_open_part, part_path_for(session_id), upload_offset)
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Часть не должна превышать {limit} байт"
+                )
+            await run_io(part.write, chunk)
+    except BaseException:
+        # Прерванная часть отбрасывается целиком, смещение остается прежним
+        received = 0
+        raise
+    finally:
+        await run_io(_close_part, part, upload_offset + received)
+        await db.execute(
+            update(UploadSessionModel)
+            .where(UploadSessionModel.id == session_id, UploadSessionModel.offset == upload_offset,
+                   UploadSessionModel.status == "writing")
+            .values(status="pending", offset=upload_offset + received)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    await db.refresh(session)
+    response.headers["Upload-Offset"] = str(session.offset)
+    return _to_schema(session)
+
+@router.post("/{session_id}/finalize", response_model=UploadSession)
+async def finalize_upload(
+    session_id: str,
+    data: UploadFinalize = UploadFinalize(),
+    db: AsyncSession = Depends(get_db)
+):
+    """Завершить загрузку: проверить файл и перенести его в хранилище"""
+    session = await _get_session(db, session_id)
+    if session.status == "completed":
+        return _to_schema(session)
+    if session.offset != session.total_size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Получено {session.offset} из {session.total_size} байт",
+            headers={"Upload-Offset": str(session.offset)}
+        )
+
+    # Сессия занимается условным UPDATE: из параллельных запросов завершает только один,
+    # остальные получают 409 (как и пока дописывается часть). При ошибке сессия возвращается
+    # в "pending", а зависшую после падения процесса можно занять снова через CHUNK_LEASE
+    claimed = await db.execute(
+        update(UploadSessionModel)
+        .where(
+            UploadSessionModel.id == session_id,
+            UploadSessionModel.offset == UploadSessionModel.total_size,
+            or_(UploadSessionModel.status == "pending",
+                and_(UploadSessionModel.status == "finalizing",
+                     UploadSessionModel.updated_at < datetime.now(timezone.utc) - CHUNK_LEASE))
+        )
+        .values(status="finalizing")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if claimed.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Загрузка уже завершается или часть файла еще загружается"
+        )
+
+    try:
+        return await _finalize(db, session, data)
+    except BaseException:
+        await db.rollback()
+        await db.execute(
+            update(UploadSessionModel)
+            .where(UploadSessionModel.id == session_id, UploadSessionModel.status == "finalizing")
+            .values(status="pending")
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        raise
+
+async def _finalize(db: AsyncSession, session: UploadSessionModel, data: UploadFinalize) -> UploadSession:
+    """Проверка файла и перенос в хранилище для занятой сессии"""
+    part_path = part_path_for(session.id)
+    content_type = sniff_content_type(await run_io(_read_head, part_path))
+    if not content_type.startswith(f"{session.kind}/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Файл должен быть изображением" if session.kind == "image" else "Файл должен быть видео"
+        )
+
+    project = None
+    if data.project_id is not None:
+        project = await db.get(ProjectModel, data.project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Проект не найден")
+        if session.kind != "image":
+            raise HTTPException(status_code=400, detail="В галерею проекта можно добавить только изображение")
+
+    info = await inspect_image(part_path, content_type)
+    sha256 = await run_io(hash_file, part_path)
+    blob = await store_file(db, part_path, sha256, os.path.getsize(part_path), session.filename, content_type)
+    apply_image_info(blob, info)
+
+    # Завершенная сессия сама ссылается на файл (по ее file_path клиент получает видео),
+    # ссылка освобождается при удалении сессии; галерея проекта держит отдельную ссылку
+    await retain(db, blob.path)
+    if project is not None:
+        await retain(db, blob.path)
+        project.gallery_images = (project.gallery_images or []) + [blob.path]
+
+    session.status = "completed"
+    session.file_path = blob.path
+    await db.commit()
+    await db.refresh(session)
+
+    if project is not None:
+        schedule_image(ProjectModel, project.id, blob.path)
+
+    return _to_schema(session)
+
+@router.delete("/{session_id}")
+async def cancel_upload(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Отменить незавершенную загрузку или удалить завершенную вместе со ссылкой сессии на файл"""
+    session = await _get_session(db, session_id)
+    part_path = part_path_for(session.id)
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    if session.status == "completed":
+        await release(db, session.file_path)
+    await db.delete(session)
+    await db.commit()
+
+    return {"message": "Загрузка отменена"}
@@ -0,0 +1,120 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.data_version import DataVersion
+
+# С валидаторами браузер все равно спрашивает сервер при каждом обращении (и получает 304),
+# а не показывает по эвристике сохраненную копию — иначе админка видела бы старые списки
+CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts) -> str:
+    """Слабый ETag: строится из метаданных данных, а не из байтов ответа"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Проверка If-None-Match (слабое сравнение, как требует RFC 9110 для этого заголовка)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return strip(etag) in {strip(tag) for tag in if_none_match.split(",")}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            # SQLite возвращает время без зоны; CURRENT_TIMESTAMP — это UTC
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        response.headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+def _tables(model) -> tuple:
+    """Таблица модели и таблицы ее связей (например, media_blobs для image_meta)"""
+    mapper = inspect(model)
+    return (mapper.local_table.name, *[relation.mapper.local_table.name for relation in mapper.relationships])
+
+async def data_versions(db: AsyncSession, tables: tuple) -> tuple:
+    """Версии таблиц из data_versions — их увеличивают триггеры базы при любой записи"""
+    rows = dict((await db.execute(
+        select(DataVersion.table_name, DataVersion.version).where(DataVersion.table_name.in_(tables))
+    )).all())
+    return tuple(rows.get(table, 0) for table in tables)
+
+async def collection_etag(db: AsyncSession, model) -> str:
+    """
+    ETag списка по версиям таблиц: один запрос по первичному ключу, без загрузки строк.
+    Меняется при любой записи в таблицы списка, в том числе из другого процесса
+    """
+    tables = _tables(model)
+    return make_etag(settings.APP_VERSION, model.__tablename__, "list", await data_versions(db, tables))
+
+async def row_validators(db: AsyncSession, model, row_id: int) -> Optional[tuple]:
+    """ETag и Last-Modified записи по ее updated_at; None, если записи нет"""
+    updated_at = (await db.execute(select(model.updated_at).where(model.id == row_id))).first()
+    if updated_at is None:
+        return None
+    # Версии защищают от двух правок за одну секунду и от изменений в связанных таблицах
+    versions = await data_versions(db, _tables(model))
+    return make_etag(settings.APP_VERSION, model.__tablename__, "row", row_id, updated_at[0], versions), updated_at[0]
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    return etag_matches(request.headers.get("if-none-match"), etag)
+
+class ETagMiddleware:
+    """
+    ETag по содержимому для остальных JSON-ответов API (категории, фасеты, поиск...):
+    ответ все равно вычисляется, но при совпадении If-None-Match тело не передается.
+    Ответы, у которых ETag уже есть (списки и записи), проходят без изменений.
+    """
+
+    def __init__(self, app, prefix: str = "/api/"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+        start, chunks = None, []
+
+        async def buffered_send(message):
+            nonlocal start
+            if start is None and message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] == 200 and b"etag" not in headers and content_type.startswith(b"application/json"):
+                    start = message
+                    return
+                start = False
+            if start is False or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+            validators = [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode())]
+            if etag_matches(if_none_match, etag):
+                await send({"type": "http.response.start", "status": 304, "headers": validators})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start, "headers": list(start.get("headers", [])) + validators})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
@@ -1,17 +1,141 @@
-from sqlalchemy import create_engine
+from functools import partial
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from .types import json_dumps, json_loads
+
+def _sqlite_pragmas(read_only: bool):
+    """PRAGMA для каждого нового соединения с SQLite"""
+    pragmas = [
+        # WAL: читатели не блокируются записью, запись не ждет читателей
+        "PRAGMA journal_mode=WAL",
+        # В режиме WAL NORMAL не теряет целостность, а fsync выполняется только при checkpoint
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_MB * 1024}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return on_connect
+
+# Асинхронные драйверы для синхронных URL из настроек
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def _is_sqlite_file(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def _create_engines(make_engine=create_engine, url=None, poolclass=QueuePool):
+    """
+    Для SQLite в файле — отдельный движок записи с одним соединением (запись в SQLite и так
+    выполняется по одной, а так запросы ждут в пуле, а не получают "database is locked")
+    и пул соединений только для чтения. Для остальных СУБД — один общий движок.
+    """
+    url = url or make_url(settings.DATABASE_URL)
+    # JSONB на PostgreSQL кодируется тем же orjson, что и JSON-колонки SQLite
+    make_engine = partial(make_engine, json_serializer=json_dumps, json_deserializer=json_loads)
+    if not _is_sqlite_file(url):
+        engine = make_engine(url)
+        return engine, engine
+
+    timeout = settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+    write_engine = make_engine(url, poolclass=poolclass, pool_size=1, max_overflow=0, pool_timeout=timeout,
+                               connect_args={"timeout": timeout})
+    read_engine = make_engine(url, poolclass=poolclass, pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0,
+                              connect_args={"timeout": timeout})
+    # У асинхронного движка события подключения вешаются на его синхронную часть
+    event.listen(getattr(write_engine, "sync_engine", write_engine), "connect", _sqlite_pragmas(read_only=False))
+    event.listen(getattr(read_engine, "sync_engine", read_engine), "connect", _sqlite_pragmas(read_only=True))
+    return write_engine, read_engine
+
+def _async_url():
+    url = make_url(settings.DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+# Синхронные движки — для фоновых задач и скриптов, асинхронные — для обработчиков запросов.
+# У каждого свое соединение записи; между собой они ждут друг друга через busy_timeout.
+engine, read_engine = _create_engines()
+async_engine, async_read_engine = _create_engines(create_async_engine, _async_url(), AsyncAdaptedQueuePool)
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет SELECT в пул чтения, а запись — в движок записи.
+    После первой записи транзакция до конца работает через движок записи,
+    чтобы видеть собственные изменения.
+    """
+
+    write_bind = engine
+    read_bind = read_engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.read_bind is self.write_bind or self._flushing or self.info.get("writing"):
+            return self.write_bind
+        if clause is not None and clause.is_select:
+            return self.read_bind
+        return self.write_bind
+
+class AsyncRoutingSession(RoutingSession):
+    """Синхронная часть AsyncSession: та же маршрутизация по асинхронным движкам"""
+    write_bind = async_engine.sync_engine
+    read_bind = async_read_engine.sync_engine
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_writing(session, flush_context):
+    session.info["writing"] = True
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_writing_statement(orm_execute_state):
+    # UPDATE/DELETE/INSERT через execute() тоже делают транзакцию пишущей,
+    # иначе следующий SELECT ушел бы в пул чтения и не увидел бы изменений
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["writing"] = True
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+# expire_on_commit=False: после commit атрибуты остаются загруженными, иначе обращение
+# к ним (например, при сериализации ответа) потребовало бы неявного запроса к базе
+AsyncSessionLocal = async_sessionmaker(sync_session_class=AsyncRoutingSession, class_=AsyncSession,
+                                       autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
+async def dispose_async_engines():
+    """Закрывает соединения асинхронных движков (у aiosqlite каждое держит свой поток)"""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+def optimize_database():
+    """
+    Периодическое обслуживание SQLite: PRAGMA optimize обновляет статистику планировщика,
+    incremental_vacuum возвращает системе освободившиеся страницы (auto_vacuum=INCREMENTAL, миграция 0003)
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA optimize"))
+        connection.execute(text("PRAGMA incremental_vacuum"))
+        connection.commit()
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Select, String, and_, func, or_, select, text, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Начиная с этого размера таблицы на PostgreSQL отдается оценка количества вместо COUNT(*)
+ESTIMATE_MIN_ROWS = 100_000
+
+# Порядок сортировки: (колонка, по убыванию)
+SortKey = Sequence[Tuple[object, bool]]
+
+def encode_cursor(values: list) -> str:
+    """Непрозрачный курсор: значения ключа сортировки последней строки страницы"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order: SortKey) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(order):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for (column, _), value in zip(order, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+
+def _sqlite_datetime(value: datetime) -> str:
+    # Так SQLite хранит CURRENT_TIMESTAMP (server_default=func.now())
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    return text + (f".{value.microsecond:06d}" if value.microsecond else "")
+
+def _after(order: SortKey, values: list, dialect: str):
+    """Условие "строка идет после курсора" для составного ключа с разными направлениями"""
+    keys = []
+    for (column, descending), value in zip(order, values):
+        if dialect == "sqlite" and isinstance(value, datetime):
+            # Сравниваем как строки в формате хранения, чтобы равенство работало и индекс использовался
+            column, value = type_coerce(column, String), _sqlite_datetime(value)
+        keys.append((column, descending, value))
+
+    conditions = []
+    for i, (column, descending, value) in enumerate(keys):
+        equal = [c == v for c, _, v in keys[:i]]
+        conditions.append(and_(*equal, column < value if descending else column > value))
+    return or_(*conditions)
+
+class Page:
+    """Страница списка: строки, курсор следующей страницы и (по запросу) общее количество"""
+
+    def __init__(self, items: List, next_cursor: Optional[str], total: Optional[int], total_estimated: bool = False):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+        self.total_estimated = total_estimated
+
+async def estimated_total(db: AsyncSession, query: Select) -> Optional[int]:
+    """
+    Оценка числа строк из статистики планировщика PostgreSQL (pg_class.reltuples).
+    Только для запросов без фильтров и только для больших таблиц, где точный COUNT(*) дорог.
+    """
+    if db.get_bind().dialect.name != "postgresql" or query.whereclause is not None:
+        return None
+    table = query.column_descriptions[0]["entity"].__table__
+    estimate = (await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {"table": table.name}
+    )).scalar()
+    return estimate if estimate is not None and estimate >= ESTIMATE_MIN_ROWS else None
+
+async def _count(db: AsyncSession, query: Select) -> int:
+    return (await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))).scalar()
+
+async def paginate(db: AsyncSession, query: Select, order: SortKey, limit: int, skip: int = 0,
+                   cursor: Optional[str] = None, with_total: bool = False) -> Page:
+    """
+    Возвращает страницу и курсор следующей страницы (None, если это последняя).
+    С курсором страница выбирается по ключу сортировки (keyset) — одинаково быстро
+    на любой глубине и без сдвигов при вставке новых строк; без курсора — по skip.
+    Общее количество (with_total) считается в том же запросе оконной функцией,
+    а для больших таблиц без фильтров на PostgreSQL берется из статистики.
+    """
+    filtered = query
+    total, total_estimated = None, False
+    if with_total:
+        total = await estimated_total(db, query)
+        total_estimated = total is not None
+
+    count_in_query = with_total and total is None and not cursor
+    if with_total and total is None and cursor:
+        # Условие курсора сузило бы оконный подсчет, поэтому считаем по фильтрам отдельно
+        total = await _count(db, filtered)
+
+    query = query.order_by(*[column.desc() if descending else column for column, descending in order])
+    if cursor:
+        query = query.where(_after(order, decode_cursor(cursor, order), db.get_bind().dialect.name))
+    elif skip:
+        query = query.offset(skip)
+
+    if count_in_query:
+        rows = (await db.execute(query.add_columns(func.count().over()).limit(limit + 1))).all()
+        items = [row[0] for row in rows]
+        # За пределами последней страницы строк нет, и окну нечего вернуть
+        total = rows[0][1] if rows else (await _count(db, filtered) if skip else 0)
+    else:
+        items = list((await db.scalars(query.limit(limit + 1))).all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column, _ in order])
+    return Page(items, next_cursor, total, total_estimated)
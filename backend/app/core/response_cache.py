@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from app.core.conditional import CACHE_CONTROL, etag_matches
+from app.core.config import settings
+from app.core.table_versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+# Кэшируемые публичные GET-маршруты -> таблицы, от которых зависит ответ.
+# media_blobs — размеры и заглушки изображений (image_meta) в элементах списков
+CACHED_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/api/v1/products/": ("products", "media_blobs"),
+    "/api/v1/products/categories/list": ("products",),
+    "/api/v1/gallery/": ("gallery", "media_blobs"),
+    "/api/v1/gallery/facets": ("gallery", "media_blobs"),
+    "/api/v1/gallery/categories": ("gallery",),
+    "/api/v1/projects/": ("projects", "media_blobs"),
+    "/api/v1/projects/facets": ("projects", "media_blobs"),
+    "/api/v1/projects/categories": ("projects",),
+}
+
+# Заголовки, которые сохраняются вместе с телом ответа
+CACHED_HEADERS = {b"content-type", b"etag", b"cache-control", b"last-modified"}
+
+class CachedResponse:
+    def __init__(self, body: bytes, headers: list, versions: tuple):
+        self.body = body
+        self.headers = headers
+        self.versions = versions
+        self.created = time.monotonic()
+
+class ResponseCache:
+    """
+    Готовые ответы (байты JSON) по маршруту и нормализованным параметрам запроса.
+    Запись считается свежей, пока не изменилась ни одна из ее таблиц (версии таблиц
+    повышаются после каждого commit, app/core/table_versions.py) и не истек TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: CachedResponse, tables: Tuple[str, ...]) -> bool:
+        return entry.versions == table_versions(tables) and time.monotonic() - entry.created < self.ttl
+
+    def put(self, key: str, entry: CachedResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+def _cache_key(scope) -> str:
+    # Порядок параметров не важен: ?a=1&b=2 и ?b=2&a=1 — один ответ
+    query = sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    return f"{scope['path']}?{urlencode(query)}"
+
+async def _empty_receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+class ResponseCacheMiddleware:
+    """
+    ASGI-middleware кэша публичных списков (CACHED_ROUTES).
+    Одновременные промахи по одному ключу ждут одного вычисления ответа.
+    С RESPONSE_CACHE_STALE_WHILE_REVALIDATE устаревший ответ отдается сразу,
+    а новый вычисляется в фоне — популярные ключи не промахиваются в момент инвалидации.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def __call__(self, scope, receive, send):
+        tables = CACHED_ROUTES.get(scope.get("path")) if scope["type"] == "http" else None
+        if tables is None or scope["method"] != "GET" or not settings.RESPONSE_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        key = _cache_key(scope)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry, tables):
+            await self._send(send, entry, "HIT", scope)
+            return
+        if entry is not None and settings.RESPONSE_CACHE_STALE_WHILE_REVALIDATE:
+            if key not in self._inflight:
+                task = asyncio.create_task(self._revalidate(key, dict(scope), tables))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            await self._send(send, entry, "STALE", scope)
+            return
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            entry = await asyncio.shield(pending)
+            if entry is not None:
+                await self._send(send, entry, "HIT", scope)
+            else:
+                # Первый запрос получил ответ, который не кэшируется (ошибку и т.п.)
+                await self.app(scope, receive, send)
+            return
+
+        status, headers, body, entry = await self._refresh(key, dict(scope), tables)
+        if entry is not None:
+            await self._send(send, entry, "MISS", scope)
+            return
+        await send({"type": "http.response.start", "status": status,
+                    "headers": headers + [(b"x-cache", b"MISS")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _refresh(self, key: str, scope, tables) -> Tuple[int, list, bytes, Optional[CachedResponse]]:
+        """Вычисляет ответ приложением и сохраняет его, если это 200 OK"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        entry = None
+        try:
+            # Версии берутся до запроса: если запись придет во время вычисления, ответ сразу устареет
+            versions = table_versions(tables)
+            status, headers, chunks = 500, [], []
+            # В кэш всегда кладется полный ответ; If-None-Match проверяется при отдаче
+            scope = {**scope, "headers": [(name, value) for name, value in scope["headers"]
+                                          if name != b"if-none-match"]}
+
+            async def capture(message):
+                nonlocal status, headers
+                if message["type"] == "http.response.start":
+                    status, headers = message["status"], list(message.get("headers", []))
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await self.app(scope, _empty_receive, capture)
+            body = b"".join(chunks)
+            if status == 200:
+                cached_headers = [(name, value) for name, value in headers if name.lower() in CACHED_HEADERS]
+                entry = CachedResponse(body, cached_headers, versions)
+                self.cache.put(key, entry)
+            return status, headers, body, entry
+        finally:
+            del self._inflight[key]
+            future.set_result(entry)
+
+    async def _revalidate(self, key: str, scope, tables):
+        try:
+            await self._refresh(key, scope, tables)
+        except Exception:
+            # Фоновая задача: кроме журнала, ошибку никто не увидит
+            logger.exception("Ошибка обновления кэша ответа %s", key)
+
+    async def _send(self, send, entry: CachedResponse, state: str, scope):
+        etag = dict(entry.headers).get(b"etag")
+        if etag and etag_matches(dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1"),
+                                 etag.decode("latin-1")):
+            headers = [(b"etag", etag), (b"cache-control", CACHE_CONTROL.encode()), (b"x-cache", state.encode())]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = entry.headers + [
+            (b"content-length", str(len(entry.body)).encode()),
+            (b"x-cache", state.encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
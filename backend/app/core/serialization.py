@@ -0,0 +1,77 @@
+from functools import lru_cache
+from typing import Any, Callable, Optional, Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# Как у Pydantic: UTC-время выводится с "Z"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+_MISSING = object()
+
+def _unwrap_optional(annotation):
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+def _is_model(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+def _value_encoder(annotation) -> Optional[Callable[[Any], Any]]:
+    """Преобразование значения поля к виду, который вернула бы схема; None — значение отдается как есть"""
+    annotation = _unwrap_optional(annotation)
+    origin = get_origin(annotation)
+    if _is_model(annotation):
+        encode = encoder(annotation)
+        return lambda value: None if value is None else encode(value)
+    if origin is list:
+        (item,) = get_args(annotation) or (Any,)
+        encode_item = _value_encoder(item)
+        if encode_item is not None:
+            return lambda value: None if value is None else [encode_item(entry) for entry in value]
+    if origin is dict:
+        _, item = get_args(annotation) or (Any, Any)
+        encode_item = _value_encoder(item) or (lambda value: value)
+        # Пустое значение любого вида (в старых строках — []) отдается пустым объектом
+        return lambda value: {key: encode_item(entry) for key, entry in (value or {}).items()}
+    return None
+
+@lru_cache(maxsize=None)
+def encoder(schema: type) -> Callable[[Any], dict]:
+    """
+    Функция "ORM-объект или dict -> dict" по полям схемы Pydantic без валидации.
+    Только для данных из своей базы: вложенные схемы (характеристики, варианты изображений)
+    получают значения по умолчанию для отсутствующих ключей, лишние ключи отбрасываются —
+    результат тот же, что у model_validate и model_dump.
+    """
+    fields = [(name, _value_encoder(field.annotation), field.get_default(call_default_factory=True))
+              for name, field in schema.model_fields.items()]
+
+    def encode(source) -> dict:
+        # У ORM-объекта загруженные атрибуты лежат в __dict__ — это быстрее дескрипторов;
+        # незагруженные (отложенные) читаются через getattr
+        values = source if isinstance(source, dict) else vars(source)
+        result = {}
+        for name, encode_value, default in fields:
+            value = values.get(name, _MISSING)
+            if value is _MISSING:
+                value = default if isinstance(source, dict) else getattr(source, name, default)
+            result[name] = value if encode_value is None else encode_value(value)
+        return result
+    return encode
+
+def list_response(schema: type, items_field: str, items: list, **fields) -> Response:
+    """
+    Ответ со списком: строки сразу кодируются в JSON через orjson, минуя проверку схемы
+    и jsonable_encoder. Схема остается response_model маршрута, поэтому контракт OpenAPI не меняется.
+    """
+    item_schema = _unwrap_optional(get_args(schema.model_fields[items_field].annotation)[0])
+    encode = encoder(item_schema)
+    fields[items_field] = [encode(item) for item in items]
+    # Поля в порядке схемы; не переданные — со значениями по умолчанию
+    content = {name: fields[name] if name in fields else field.get_default(call_default_factory=True)
+               for name, field in schema.model_fields.items()}
+    return Response(orjson.dumps(content, option=ORJSON_OPTIONS), media_type="application/json")
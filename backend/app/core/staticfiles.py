@@ -0,0 +1,236 @@
+import os
+import re
+
+import anyio
+from typing import Optional
+
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, no-cache"
+
+# Файлы, имя которых — хэш содержимого: uploads/blobs/ и производные от них миниатюры/варианты
+HASHED_UPLOAD = re.compile(r"^(?:(?:thumbnails|variants)/)?blobs/[0-9a-f]{2}/[0-9a-f]{64}[^/]*$")
+
+# Элемент заголовка Range: "first-last", "first-" или "-suffix"
+RANGE_SPEC = re.compile(r"([0-9]*)-([0-9]*)")
+
+# Ассеты сборки Vite: assets/index-c8920a4a.js
+HASHED_ASSET = re.compile(r"^assets/.+-[0-9a-zA-Z_-]{8,}\.\w+$")
+
+def not_modified(response: Response, request_headers: Headers) -> bool:
+    """Совпадает ли ETag ответа с If-None-Match запроса"""
+    if_none_match = request_headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    etag = response.headers.get("etag")
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+class UploadStaticFiles(StaticFiles):
+    """
+    Раздача uploads: файлы с хэшем содержимого в имени кэшируются навсегда (immutable)
+    со строгим ETag по хэшу, остальные — с обязательной проверкой через If-None-Match.
+    """
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=scope["method"])
+
+        relative = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+        if HASHED_UPLOAD.match(relative):
+            # Имя файла уже однозначно определяет содержимое — это и есть строгий ETag
+            response.headers["etag"] = f'"{os.path.basename(relative)}"'
+            response.headers["cache-control"] = IMMUTABLE_CACHE
+        else:
+            response.headers["cache-control"] = REVALIDATE_CACHE
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+class PrecompressedStaticFiles(UploadStaticFiles):
+    """
+    Раздача собранного фронтенда (frontend/dist): отдает заранее сжатые соседние файлы
+    .br/.gz по Accept-Encoding, хэшированные ассеты кэшируются навсегда,
+    неизвестные пути приложения отдают index.html.
+    """
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def _compressed_sibling(self, full_path: str, scope: Scope) -> Optional[tuple]:
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+        for encoding, suffix in self.ENCODINGS:
+            if encoding in accepted and os.path.isfile(full_path + suffix):
+                return encoding, full_path + suffix
+        return None
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        full_path = str(full_path)
+        sibling = self._compressed_sibling(full_path, scope)
+        if sibling:
+            encoding, compressed_path = sibling
+            response = FileResponse(
+                compressed_path,
+                status_code=status_code,
+                method=scope["method"],
+                media_type=FileResponse(full_path, stat_result=stat_result).media_type,
+            )
+            response.headers["content-encoding"] = encoding
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=scope["method"])
+        response.headers["vary"] = "Accept-Encoding"
+
+        relative = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+        response.headers["cache-control"] = IMMUTABLE_CACHE if HASHED_ASSET.match(relative) else REVALIDATE_CACHE
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            # Маршруты React Router (/gallery, /admin/...) обслуживает index.html
+            if exc.status_code != 404 or "." in os.path.basename(path):
+                raise
+            return await super().get_response("index.html", scope)
+
+class RangeFileResponse(Response):
+    """
+    Ответ-файл с поддержкой HTTP Range (206, несколько диапазонов, If-Range).
+    Если сервер поддерживает ASGI-расширение http.response.zerocopysend,
+    байты отправляются через sendfile без копирования в буферы Python.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, stat_result: os.stat_result, request_headers: Headers,
+                 media_type: Optional[str] = None, method: str = "GET", headers: Optional[dict] = None):
+        super().__init__(status_code=200, media_type=None, headers=headers)
+        self.path = path
+        self.send_body = method != "HEAD"
+        self.file_size = stat_result.st_size
+
+        probe = FileResponse(path, stat_result=stat_result, media_type=media_type)
+        self.content_type = probe.media_type or "application/octet-stream"
+        for name in ("etag", "last-modified"):
+            self.headers.setdefault(name, probe.headers[name])
+        self.headers["accept-ranges"] = "bytes"
+
+        self.ranges = self._requested_ranges(request_headers)
+        self.boundary = None
+        if self.ranges is None:
+            self.ranges = [(0, self.file_size)]
+            self.headers["content-type"] = self._content_type_header()
+            self.headers["content-length"] = str(self.file_size)
+        elif not self.ranges:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{self.file_size}"
+            self.headers["content-length"] = "0"
+        elif len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.status_code = 206
+            self.headers["content-type"] = self._content_type_header()
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{self.file_size}"
+            self.headers["content-length"] = str(end - start)
+        else:
+            self.status_code = 206
+            self.boundary = os.urandom(16).hex()
+            self.headers["content-type"] = f"multipart/byteranges; boundary={self.boundary}"
+            self.headers["content-length"] = str(
+                sum(len(self._part_header(start, end)) + end - start for start, end in self.ranges)
+                + len(self._closing_boundary())
+            )
+
+    def _content_type_header(self) -> str:
+        if self.content_type.startswith("text/"):
+            return f"{self.content_type}; charset=utf-8"
+        return self.content_type
+
+    def _requested_ranges(self, request_headers: Headers) -> Optional[list]:
+        """
+        None — отдать файл целиком; [] — диапазоны невыполнимы (416);
+        иначе список полуоткрытых интервалов [start, end).
+        """
+        header = request_headers.get("range")
+        if not header or not header.startswith("bytes="):
+            return None
+
+        # If-Range: если файл изменился, диапазон игнорируется и отдается весь файл
+        if_range = request_headers.get("if-range")
+        if if_range and if_range not in (self.headers["etag"], self.headers["last-modified"]):
+            return None
+
+        # Синтаксически некорректный Range игнорируется целиком (RFC 9110, 14.2) — отдается весь файл;
+        # 416 только для корректных диапазонов за пределами файла
+        parts = [part.strip() for part in header[len("bytes="):].split(",") if part.strip()]
+        if not parts:
+            return None
+        ranges = []
+        for part in parts:
+            match = RANGE_SPEC.fullmatch(part)
+            if match is None or not any(match.groups()):
+                return None
+            start_text, end_text = match.groups()
+            if start_text:
+                start = int(start_text)
+                if end_text and int(end_text) < start:
+                    return None  # bytes=5-2
+                end = min(int(end_text) + 1 if end_text else self.file_size, self.file_size)
+            else:
+                start, end = max(self.file_size - int(end_text), 0), self.file_size
+            if start < end:
+                ranges.append((start, end))
+        if len(ranges) > 16:
+            return None  # Слишком много диапазонов — проще отдать файл целиком
+        return ranges
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"\r\n--{self.boundary}\r\n"
+            f"Content-Type: {self._content_type_header()}\r\n"
+            f"Content-Range: bytes {start}-{end - 1}/{self.file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    def _closing_boundary(self) -> bytes:
+        return f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.status_code == 416:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        with open(self.path, "rb") as file:
+            for start, end in self.ranges:
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+                if zerocopy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file.fileno(),
+                        "offset": start,
+                        "count": end - start,
+                        "more_body": True,
+                    })
+                else:
+                    await self._send_chunks(file, start, end, send)
+        closing = self._closing_boundary() if self.boundary else b""
+        await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+    async def _send_chunks(self, file, start: int, end: int, send):
+        await anyio.to_thread.run_sync(file.seek, start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(file.read, min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
@@ -0,0 +1,52 @@
+import itertools
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import event
+
+from app.core.database import RoutingSession
+
+# Версии таблиц в этом процессе: повышаются после каждого commit, изменившего таблицу.
+# По ним устаревает кэш ответов (response_cache.py); записи других процессов он не видит —
+# их ограничивает TTL кэша, а ETag строится по версиям в базе (data_versions, conditional.py)
+_versions: Dict[str, int] = {}
+# next() у itertools.count атомарен — версии повышаются и из потоков фоновой обработки
+_counter = itertools.count(1)
+
+def table_versions(tables: Tuple[str, ...]) -> tuple:
+    return tuple(_versions.get(table, 0) for table in tables)
+
+def bump(tables: Iterable[str]):
+    for table in tables:
+        _versions[table] = next(_counter)
+
+# Таблицы, измененные в транзакции, запоминаются при flush и массовых INSERT/UPDATE/DELETE,
+# а их версии повышаются после commit. Так учитываются и обработчики запросов,
+# и фоновые задачи (миниатюры, очистка), работающие через те же сессии
+
+def _remember_tables(session, tables):
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    _remember_tables(session, {
+        table.name
+        for instance in itertools.chain(session.new, session.dirty, session.deleted)
+        for table in [getattr(instance, "__table__", None)] if table is not None
+    })
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _remember_tables(orm_execute_state.session, {table.name})
+
+@event.listens_for(RoutingSession, "after_commit")
+def _bump_changed_tables(session):
+    tables: Set[str] = session.info.pop("changed_tables", set())
+    if tables:
+        bump(tables)
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_changed_tables(session):
+    session.info.pop("changed_tables", None)
@@ -0,0 +1,98 @@
+import re
+
+import orjson
+from sqlalchemy import Boolean, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement, literal
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlalchemy.types import TypeDecorator
+
+def json_dumps(value) -> str:
+    """Компактный JSON в UTF-8 без \\uXXXX-экранирования кириллицы"""
+    return orjson.dumps(value).decode()
+
+def json_loads(value):
+    return orjson.loads(value)
+
+class JSONType(TypeDecorator):
+    """
+    Общий тип JSON-колонок: JSONB на PostgreSQL (фильтры используют GIN-индексы),
+    текст на SQLite (фильтры выполняются функциями JSON1 внутри базы).
+    empty — фабрика значения для пустой колонки (list, dict или None).
+    Кодирование и разбор — orjson (json_dumps/json_loads); на PostgreSQL те же функции
+    подключены к движку как json_serializer/json_deserializer.
+    """
+    impl = Text
+    # Параметры типа (empty) не влияют на SQL, поэтому выражения с ним можно кэшировать
+    cache_ok = True
+
+    def __init__(self, empty=list, **kwargs):
+        super().__init__(**kwargs)
+        self.empty = empty
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            # Уже сериализованный JSON (так писал старый код)
+            try:
+                value = json_loads(value)
+            except ValueError:
+                pass
+        if value is None or dialect.name == "postgresql":
+            return value
+        return json_dumps(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str) and dialect.name != "postgresql":
+            try:
+                value = json_loads(value)
+            except ValueError:
+                value = None
+        if value is None:
+            return self.empty() if self.empty else None
+        return value
+
+class json_contains(ColumnElement):
+    """
+    Условие "JSON-массив в колонке содержит значение": json_contains(Project.technologies, "PVD").
+    key — ключ объекта, в котором лежит массив: json_contains(Product.specifications, "Золотой", "colors").
+    """
+    inherit_cache = True
+    type = Boolean()
+
+    _traverse_internals = [
+        ("column", InternalTraversal.dp_clauseelement),
+        ("value", InternalTraversal.dp_clauseelement),
+        ("key", InternalTraversal.dp_string),
+    ]
+
+    def __init__(self, column, value, key=None):
+        if key is not None and not re.fullmatch(r"\w+", key):
+            raise ValueError(f"Недопустимый ключ JSON: {key}")
+        self.column = column
+        self.value = literal(value)
+        self.key = key
+
+@compiles(json_contains)
+def _json_contains_json1(element, compiler, **kw):
+    # json_each по некорректному JSON прервал бы весь запрос, поэтому такие строки пропускаем
+    column = compiler.process(element.column, **kw)
+    path = f", '$.{element.key}'" if element.key else ""
+    value = compiler.process(element.value, **kw)
+    return (f"EXISTS (SELECT 1 FROM json_each(CASE WHEN json_valid({column}) THEN {column} END{path}) "
+            f"WHERE json_each.value = {value})")
+
+@compiles(json_contains, "postgresql")
+def _json_contains_jsonb(element, compiler, **kw):
+    # Оператор @> по всей колонке, чтобы работал GIN-индекс jsonb_path_ops
+    column = compiler.process(element.column, **kw)
+    value = compiler.process(element.value, **kw)
+    document = f"jsonb_build_array(CAST({value} AS TEXT))"
+    if element.key:
+        document = f"jsonb_build_object('{element.key}', {document})"
+    return f"({column} @> {document})"
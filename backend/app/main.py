@@ -1,16 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 
-from app.core.database import engine, Base
+from app.core.config import settings
+from app.core.database import dispose_async_engines
+from app.core.conditional import ETagMiddleware
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.staticfiles import UploadStaticFiles, PrecompressedStaticFiles
 from app.api.v1 import api_router
+from app.api.media import router as media_router
+from app.services.images import shutdown_pool
+from app.services.cleanup import start_cleanup, stop_cleanup
 
-# Импортируем модели для создания таблиц
-from app.models import product, gallery, project, certificate, page_content, application
-
-# Создаем таблицы при запуске
-Base.metadata.create_all(bind=engine)
+# Импортируем все модели, чтобы связи между ними были настроены.
+# Схема базы создается и обновляется миграциями Alembic (alembic upgrade head, см. run_server.py)
+from app.models import product, gallery, project, certificate, page_content, application, media, upload_session, pending_deletion, category_count, data_version
 
 app = FastAPI(
     title="Инокс Металл Арт API",
@@ -18,6 +22,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# ETag по содержимому для JSON-ответов API, у которых нет своих валидаторов;
+# подключается первым (самый внутренний), чтобы ETag попадал и в кэш ответов
+app.add_middleware(ETagMiddleware)
+
+# Кэш готовых ответов публичных списков; подключается раньше CORS, чтобы заголовки CORS
+# добавлялись к каждому ответу, а в кэше лежало только тело
+app.add_middleware(ResponseCacheMiddleware)
+
 # CORS настройки для разработки
 app.add_middleware(
     CORSMiddleware,
@@ -38,20 +50,39 @@ upload_dirs = [
     "uploads/projects",
     "uploads/certificates",
     "uploads/technologies",
-    "uploads/thumbnails"
+    "uploads/thumbnails",
+    "uploads/blobs",
+    "uploads/variants"
 ]
 
 for upload_dir in upload_dirs:
     os.makedirs(upload_dir, exist_ok=True)
 
-# Статические файлы
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Статические файлы: файлы с хэшем в имени кэшируются навсегда, остальные проверяются по ETag
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
+
+# Изображения, уменьшенные на лету: /img/gallery/a.jpg?w=640&fmt=webp
+app.include_router(media_router, tags=["media"])
+
+# Отложенное удаление файлов и поиск потерянных загрузок
+@app.on_event("startup")
+async def start_background_cleanup():
+    start_cleanup()
 
-@app.get("/")
-async def root():
-    return {"message": "Инокс Металл Арт API работает!"}
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    stop_cleanup()
+    shutdown_pool()
+    await dispose_async_engines()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+# Собранный фронтенд подключается последним, чтобы не перекрывать API
+if settings.FRONTEND_DIST_DIR and os.path.isdir(settings.FRONTEND_DIST_DIR):
+    app.mount("/", PrecompressedStaticFiles(directory=settings.FRONTEND_DIST_DIR, html=True), name="frontend")
+else:
+    @app.get("/")
+    async def root():
+        return {"message": "Инокс Металл Арт API работает!"}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, Enum
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
@@ -13,6 +13,10 @@ class ProductType(str, enum.Enum):
 class Application(Base):
     __tablename__ = "applications"
     
+    __table_args__ = (
+        Index("ix_applications_status_created_at", "status", "created_at"),  # Миграция 0002
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     company = Column(String(200), nullable=False)
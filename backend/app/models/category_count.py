@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.core.database import Base
+
+class CategoryCount(Base):
+    """
+    Количество записей по категории и статусу. Поддерживается триггерами базы (миграция 0006)
+    в той же транзакции, что и изменение записи; сверка и пересчет — check_counters.py
+    """
+    __tablename__ = "category_counts"
+    
+    entity_type = Column(String(20), primary_key=True)  # product/gallery/project
+    category = Column(String(100), primary_key=True)
+    status = Column(String(20), primary_key=True)  # Пустая строка, если статус не задан
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, String
+from app.core.database import Base
+
+class DataVersion(Base):
+    """
+    Версия данных таблицы. Увеличивается триггерами базы (миграция 0008) при любом изменении
+    строк — кем бы оно ни было сделано; по ней строятся ETag ответов API
+    """
+    __tablename__ = "data_versions"
+    
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
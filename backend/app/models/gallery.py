@@ -1,41 +1,40 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, Boolean
 from sqlalchemy.sql import func
-from sqlalchemy.types import TypeDecorator
-import json
+from sqlalchemy.orm import relationship
 from app.core.database import Base
-
-class JSONString(TypeDecorator):
-    """Кастомный тип для хранения JSON в виде строки"""
-    impl = String
-    
-    def process_bind_param(self, value, dialect):
-        if value is not None:
-            if isinstance(value, list):
-                return json.dumps(value, ensure_ascii=False)
-            return value
-        return None
-    
-    def process_result_value(self, value, dialect):
-        if value is not None:
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
+from app.core.types import JSONType
+from app.models.media import MediaBlob
 
 class Gallery(Base):
     __tablename__ = "gallery"
     
+    __table_args__ = (
+        # Фильтр и сортировка списка (миграция 0002)
+        Index("ix_gallery_list", "status", "category", "sort_order", "created_at"),
+        # GIN-индекс для фильтров по содержимому JSON (на SQLite не создается)
+        Index("ix_gallery_features_gin", "features", postgresql_using="gin",
+              postgresql_ops={"features": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
     category = Column(String(100), nullable=False, index=True)  # PVD покрытия, Патинирование, etc.
-    color = Column(String(100), nullable=True)  # Золотой, Бронзовый, etc.
-    finish = Column(String(100), nullable=True)  # Зеркальный, Матовая, etc.
+    color = Column(String(100), nullable=True, index=True)  # Золотой, Бронзовый, etc.
+    finish = Column(String(100), nullable=True, index=True)  # Зеркальный, Матовая, etc.
     image_path = Column(String(500), nullable=True)
     thumbnail_path = Column(String(500), nullable=True)
-    features = Column(JSONString, nullable=True)  # Дополнительные характеристики
+    image_variants = Column(JSONType, nullable=True)  # Варианты изображения разной ширины
+    features = Column(JSONType, nullable=True)  # Дополнительные характеристики
     status = Column(String(20), default="active", index=True)  # active/inactive
     sort_order = Column(Integer, default=0)  # Порядок сортировки
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Размеры и заглушка изображения из хранилища (для списков загружается одним запросом)
+    image_meta = relationship(
+        MediaBlob,
+        primaryjoin="foreign(Gallery.image_path) == MediaBlob.path",
+        viewonly=True,
+        lazy="selectin",
+    )
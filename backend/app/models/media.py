@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class MediaBlob(Base):
+    """Загруженный файл, хранящийся один раз под именем по SHA-256 содержимого"""
+    __tablename__ = "media_blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    path = Column(String(500), nullable=False, unique=True, index=True)  # uploads/blobs/ab/<sha256>.jpg
+    size = Column(Integer, nullable=False)  # Размер в байтах
+    content_type = Column(String(100), nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)  # Сколько записей ссылается на файл
+    width = Column(Integer, nullable=True)  # Размеры изображения в пикселях
+    height = Column(Integer, nullable=True)
+    format = Column(String(10), nullable=True)  # Формат изображения: jpeg, png, webp...
+    placeholder = Column(Text, nullable=True)  # Превью ~20px в виде data URI (LQIP)
+    dominant_color = Column(String(7), nullable=True)  # Преобладающий цвет, #rrggbb
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class PendingDeletion(Base):
+    """Файл, который удалит фоновая очистка (удаление не выполняется внутри запроса)"""
+    __tablename__ = "pending_deletions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String(500), nullable=False, index=True)  # Путь к файлу в uploads/
+    delete_after = Column(DateTime(timezone=True), nullable=False, index=True)  # Не раньше этого момента
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
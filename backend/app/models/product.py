@@ -1,41 +1,43 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, Boolean, Float
 from sqlalchemy.sql import func
-from sqlalchemy.types import TypeDecorator, JSON
-import json
+from sqlalchemy.orm import relationship
 from app.core.database import Base
-
-class JSONString(TypeDecorator):
-    """Кастомный тип для хранения JSON в виде строки"""
-    impl = String
-    
-    def process_bind_param(self, value, dialect):
-        if value is not None:
-            if isinstance(value, (list, dict)):
-                return json.dumps(value, ensure_ascii=False)
-            return value
-        return None
-    
-    def process_result_value(self, value, dialect):
-        if value is not None:
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return {} if isinstance(value, str) and value.startswith('{') else []
-        return {} if isinstance(value, str) and value.startswith('{') else []
+from app.core.types import JSONType
+from app.models.media import MediaBlob
 
 class Product(Base):
     __tablename__ = "products"
     
+    __table_args__ = (
+        # Фильтр и сортировка списка (миграция 0002)
+        Index("ix_products_list", "status", "category", "created_at"),
+        # GIN-индексы для фильтров по содержимому JSON (на SQLite не создаются)
+        Index("ix_products_features_gin", "features", postgresql_using="gin",
+              postgresql_ops={"features": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_products_specifications_gin", "specifications", postgresql_using="gin",
+              postgresql_ops={"specifications": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
     category = Column(String(100), nullable=False, index=True)
     description = Column(Text, nullable=True)
-    features = Column(JSONString, nullable=True)  # Используем наш кастомный тип
+    features = Column(JSONType, nullable=True)
     image_path = Column(String(500), nullable=True)  # Основное изображение
-    images = Column(JSONString, nullable=True)  # Массив путей к дополнительным изображениям
-    specifications = Column(JSONString, nullable=True)  # Технические характеристики
-    detailed = Column(JSONString, nullable=True)  # Детальная информация
+    thumbnail_path = Column(String(500), nullable=True)  # Миниатюра основного изображения
+    image_variants = Column(JSONType, nullable=True)  # Варианты основного изображения разной ширины
+    images = Column(JSONType, nullable=True)  # Массив путей к дополнительным изображениям
+    specifications = Column(JSONType(empty=None), nullable=True)  # Технические характеристики
+    detailed = Column(JSONType(empty=None), nullable=True)  # Детальная информация
     price = Column(Float, nullable=True)  # Цена
     status = Column(String(20), default="active", index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Размеры и заглушка изображения из хранилища (для списков загружается одним запросом)
+    image_meta = relationship(
+        MediaBlob,
+        primaryjoin="foreign(Product.image_path) == MediaBlob.path",
+        viewonly=True,
+        lazy="selectin",
+    )
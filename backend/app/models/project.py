@@ -1,31 +1,23 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, Boolean
 from sqlalchemy.sql import func
-from sqlalchemy.types import TypeDecorator
-import json
+from sqlalchemy.orm import relationship
 from app.core.database import Base
-
-class JSONString(TypeDecorator):
-    """Кастомный тип для хранения JSON в виде строки"""
-    impl = String
-    
-    def process_bind_param(self, value, dialect):
-        if value is not None:
-            if isinstance(value, list):
-                return json.dumps(value, ensure_ascii=False)
-            return value
-        return None
-    
-    def process_result_value(self, value, dialect):
-        if value is not None:
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
+from app.core.types import JSONType
+from app.models.media import MediaBlob
 
 class Project(Base):
     __tablename__ = "projects"
     
+    __table_args__ = (
+        # Фильтр и сортировка списка (миграция 0002)
+        Index("ix_projects_list", "status", "category", "sort_order", "created_at"),
+        # GIN-индексы для фильтров по содержимому JSON (на SQLite не создаются)
+        Index("ix_projects_features_gin", "features", postgresql_using="gin",
+              postgresql_ops={"features": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_projects_technologies_gin", "technologies", postgresql_using="gin",
+              postgresql_ops={"technologies": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
@@ -36,12 +28,22 @@ class Project(Base):
     area = Column(String(100), nullable=True)  # Площадь проекта
     completion_date = Column(String(100), nullable=True)  # Дата завершения
     main_image_path = Column(String(500), nullable=True)
-    gallery_images = Column(JSONString, nullable=True)  # Массив путей к изображениям
-    features = Column(JSONString, nullable=True)  # Особенности проекта
-    technologies = Column(JSONString, nullable=True)  # Использованные технологии
+    thumbnail_path = Column(String(500), nullable=True)  # Миниатюра главного изображения
+    image_variants = Column(JSONType, nullable=True)  # Варианты главного изображения разной ширины
+    gallery_images = Column(JSONType, nullable=True)  # Массив путей к изображениям
+    gallery_image_variants = Column(JSONType(empty=dict), nullable=True)  # Путь изображения -> его варианты
+    features = Column(JSONType, nullable=True)  # Особенности проекта
+    technologies = Column(JSONType, nullable=True)  # Использованные технологии
     status = Column(String(20), default="active", index=True)  # active/inactive
     sort_order = Column(Integer, default=0)  # Порядок сортировки
     is_featured = Column(Boolean, default=False)  # Выделенный проект
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-
+    
+    # Размеры и заглушка изображения из хранилища (для списков загружается одним запросом)
+    image_meta = relationship(
+        MediaBlob,
+        primaryjoin="foreign(Project.main_image_path) == MediaBlob.path",
+        viewonly=True,
+        lazy="selectin",
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class UploadSession(Base):
+    """Состояние возобновляемой загрузки большого файла по частям"""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(36), primary_key=True)  # UUID сессии
+    filename = Column(String(255), nullable=False)
+    kind = Column(String(20), nullable=False, default="image")  # image/video
+    total_size = Column(BigInteger, nullable=False)  # Ожидаемый размер файла в байтах
+    offset = Column(BigInteger, nullable=False, default=0)  # Сколько байт уже получено
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending/writing (принимается часть)/finalizing (файл переносится в хранилище)/completed
+    file_path = Column(String(500), nullable=True)  # Путь в хранилище после завершения
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+class FacetValue(BaseModel):
+    """Значение фасета и число записей с ним при остальных выбранных фильтрах"""
+    value: str
+    count: int
+    selected: bool = False
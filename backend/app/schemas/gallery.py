@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from app.schemas.facets import FacetValue
+from app.schemas.image import ImageMeta, ImageVariant
+
 class GalleryBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = None
@@ -29,6 +32,8 @@ class Gallery(GalleryBase):
     id: int
     image_path: Optional[str] = None
     thumbnail_path: Optional[str] = None
+    image_variants: Optional[List[ImageVariant]] = []
+    image_meta: Optional[ImageMeta] = None
     created_at: datetime
     updated_at: datetime
 
@@ -37,7 +42,16 @@ class Gallery(GalleryBase):
 
 class GalleryList(BaseModel):
     galleries: List[Gallery]
-    total: int
+    total: Optional[int] = None  # Не считается при with_total=false
+    total_estimated: bool = False  # total — оценка по статистике PostgreSQL
+    page: Optional[int] = None  # Номер страницы в режиме skip/limit
+    size: int
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (None — страница последняя)
+
+class GalleryFacets(BaseModel):
+    galleries: List[Gallery]
+    total: int  # Под всеми выбранными фильтрами
+    facets: Dict[str, List[FacetValue]]  # category, color, finish, status
     page: int
     size: int
 
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class ImageVariant(BaseModel):
+    """Вариант изображения определенной ширины и формата (для srcset)"""
+    url: str
+    width: int
+    height: int
+    format: str
+
+class ImageMeta(BaseModel):
+    """Размеры и заглушка изображения: позволяют зарезервировать место и сразу показать превью"""
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: Optional[str] = None  # data URI превью ~20px
+    dominant_color: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -5,6 +5,8 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from app.schemas.image import ImageMeta, ImageVariant
+
 class Specifications(BaseModel):
     """Технические характеристики продукта"""
     type: Optional[str] = None
@@ -64,6 +66,9 @@ class ProductUpdate(BaseModel):
 class Product(ProductBase):
     """Полная схема продукта"""
     id: int
+    thumbnail_path: Optional[str] = None
+    image_variants: Optional[List[ImageVariant]] = []
+    image_meta: Optional[ImageMeta] = None
     created_at: datetime
     updated_at: datetime
 
@@ -73,9 +78,11 @@ class Product(ProductBase):
 class ProductList(BaseModel):
     """Схема для списка продуктов с пагинацией"""
     products: List[Product]
-    total: int
-    page: int
+    total: Optional[int] = None  # Не считается при with_total=false
+    total_estimated: bool = False  # total — оценка по статистике PostgreSQL
+    page: Optional[int] = None  # Номер страницы в режиме skip/limit
     size: int
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (None — страница последняя)
 
 class ProductCategory(BaseModel):
     """Схема для категории продукта"""
@@ -1,7 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from app.schemas.facets import FacetValue
+from app.schemas.image import ImageMeta, ImageVariant
+
 class ProjectBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = None
@@ -38,16 +41,35 @@ class ProjectUpdate(BaseModel):
 class Project(ProjectBase):
     id: int
     main_image_path: Optional[str] = None
+    thumbnail_path: Optional[str] = None
+    image_variants: Optional[List[ImageVariant]] = []
+    image_meta: Optional[ImageMeta] = None
     gallery_images: Optional[List[str]] = []
+    gallery_image_variants: Optional[Dict[str, List[ImageVariant]]] = {}
     created_at: datetime
     updated_at: datetime
 
+    @field_validator("gallery_image_variants", mode="before")
+    @classmethod
+    def empty_variants(cls, value):
+        # В старых строках вместо пустого объекта может храниться []
+        return value or {}
+
     class Config:
         from_attributes = True
 
 class ProjectList(BaseModel):
     projects: List[Project]
-    total: int
+    total: Optional[int] = None  # Не считается при with_total=false
+    total_estimated: bool = False  # total — оценка по статистике PostgreSQL
+    page: Optional[int] = None  # Номер страницы в режиме skip/limit
+    size: int
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (None — страница последняя)
+
+class ProjectFacets(BaseModel):
+    projects: List[Project]
+    total: int  # Под всеми выбранными фильтрами
+    facets: Dict[str, List[FacetValue]]  # category, status, technologies
     page: int
     size: int
 
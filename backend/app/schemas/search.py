@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from enum import Enum
+
+class SearchEntityType(str, Enum):
+    PRODUCT = "product"
+    GALLERY = "gallery"
+    PROJECT = "project"
+
+class SearchResult(BaseModel):
+    type: SearchEntityType
+    id: int
+    title: str  # Название, найденные слова выделены <mark>
+    snippet: str  # Фрагмент описания или характеристик с выделенными словами
+    score: float  # Релевантность: чем больше, тем выше в выдаче
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    counts: Dict[SearchEntityType, int]  # Совпадения по каждому типу (без учета фильтра type)
+    total: int  # Совпадения по выбранным типам
+    page: Optional[int] = None
+    size: int
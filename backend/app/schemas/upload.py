@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    total_size: int = Field(..., gt=0)
+    kind: str = Field(default="image", pattern="^(image|video)$")
+
+class UploadFinalize(BaseModel):
+    project_id: Optional[int] = None  # Добавить изображение в галерею проекта
+
+class UploadSession(BaseModel):
+    id: str
+    filename: str
+    kind: str
+    total_size: int
+    offset: int
+    status: str
+    file_path: Optional[str] = None
+    chunk_size: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
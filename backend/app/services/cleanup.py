@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, optimize_database
+from app.models.application import Application
+from app.models.certificate import Certificate
+from app.models.gallery import Gallery
+from app.models.media import MediaBlob
+from app.models.pending_deletion import PendingDeletion
+from app.models.product import Product
+from app.models.project import Project
+from app.models.upload_session import UploadSession
+from app.services.images import VARIANT_SAVE_OPTIONS, remove_derived_for, thumbnail_path_for, variant_stem_for
+
+logger = logging.getLogger(__name__)
+
+# Папки, которые заполняет само приложение. Остальное в uploads/ (videos, technologies)
+# кладется вручную и очисткой не трогается.
+GC_DIRS = [
+    "uploads/blobs",
+    "uploads/thumbnails",
+    "uploads/variants",
+    "uploads/tmp",
+    "uploads/products",
+    "uploads/gallery",
+    "uploads/projects",
+    "uploads/certificates",
+    "uploads/applications",
+]
+
+RESUMABLE_DIR = "uploads/tmp/resumable"
+
+VARIANT_NAME = re.compile(rf"(.+)_\d+\.({'|'.join(VARIANT_SAVE_OPTIONS)})")
+
+_task: Optional[asyncio.Task] = None
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def part_path_for(session_id: str) -> str:
+    """Файл, в который дописываются части возобновляемой загрузки"""
+    return f"{RESUMABLE_DIR}/{session_id}.part"
+
+def _remove_file(path: str):
+    """Удаляет файл вместе с миниатюрой и вариантами"""
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            logger.exception("Не удалось удалить %s", path)
+    remove_derived_for(path)
+
+def schedule_deletion(db: Session, path: str):
+    """Откладывает удаление файла: его выполнит фоновая очистка после FILE_DELETE_DELAY_MINUTES"""
+    db.add(PendingDeletion(path=path, delete_after=_now() + timedelta(minutes=settings.FILE_DELETE_DELAY_MINUTES)))
+
+def sweep_pending_deletions(db: Session, force: bool = False) -> int:
+    """
+    Удаляет файлы, срок отложенного удаления которых наступил.
+    Файл остается, если за это время на него снова сослались: через счетчик хранилища
+    или, для файлов без записи в media_blobs, напрямую из записей. Возвращает количество удаленных.
+    """
+    query = db.query(PendingDeletion)
+    if not force:
+        query = query.filter(PendingDeletion.delete_after <= _now())
+
+    removed = 0
+    sources = None
+    for pending in query.all():
+        blob = db.query(MediaBlob).filter(MediaBlob.path == pending.path).first()
+        if blob is None or blob.ref_count == 0:
+            if sources is None:
+                sources = referenced_sources(db)
+            if _normalize(pending.path) not in sources:
+                _remove_file(pending.path)
+                if blob is not None:
+                    db.delete(blob)
+                removed += 1
+        db.delete(pending)
+    db.commit()
+    return removed
+
+def cleanup_upload_sessions(db: Session) -> int:
+    """
+    Удаляет брошенные незавершенные загрузки по частям, которые не обновлялись дольше
+    UPLOAD_SESSION_TTL_HOURS. Завершенные сессии ссылаются на сохраненный файл и остаются
+    до явного удаления через API
+    """
+    cutoff = _now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    stale = (db.query(UploadSession)
+             .filter(UploadSession.status != "completed", UploadSession.updated_at < cutoff).all())
+    for session in stale:
+        part_path = part_path_for(session.id)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        db.delete(session)
+    db.commit()
+    return len(stale)
+
+def _normalize(path: str) -> str:
+    return path.replace("\\", "/").lstrip("/")
+
+def referenced_sources(db: Session) -> Set[str]:
+    """Все исходные файлы, на которые ссылаются записи"""
+    paths = set()
+    for image_path, images in db.query(Product.image_path, Product.images):
+        paths.add(image_path)
+        paths.update(images or [])
+    for (image_path,) in db.query(Gallery.image_path):
+        paths.add(image_path)
+    for main_image_path, gallery_images in db.query(Project.main_image_path, Project.gallery_images):
+        paths.add(main_image_path)
+        paths.update(gallery_images or [])
+    for (image_path,) in db.query(Certificate.image_path):
+        paths.add(image_path)
+    for (file_paths,) in db.query(Application.file_paths):
+        try:
+            paths.update(json.loads(file_paths or "[]"))
+        except ValueError:
+            pass
+    return {_normalize(path) for path in paths if path}
+
+def referenced_paths(db: Session) -> Set[str]:
+    """Исходные файлы, их миниатюры, файлы завершенных загрузок по частям и части незавершенных"""
+    sources = referenced_sources(db)
+    paths = set(sources)
+    paths.update(thumbnail_path_for(path) for path in sources)
+    for model in (Product, Gallery, Project):
+        paths.update(_normalize(path) for (path,) in db.query(model.thumbnail_path) if path)
+    for session_id, status, file_path in db.query(UploadSession.id, UploadSession.status, UploadSession.file_path):
+        if status == "completed":
+            if file_path:
+                paths.add(_normalize(file_path))
+        else:
+            paths.add(part_path_for(session_id))
+    return paths
+
+def collect_garbage(db: Session, grace_hours: Optional[int] = None, dry_run: bool = False) -> List[str]:
+    """
+    Mark-and-sweep: собирает все пути, на которые ссылаются записи, и удаляет из папок
+    приложения файлы, на которые не ссылается никто и которые старше grace_hours
+    (свежие файлы могут принадлежать еще не завершенному запросу). Возвращает удаленные пути.
+    """
+    if grace_hours is None:
+        grace_hours = settings.ORPHAN_GRACE_HOURS
+    if not dry_run:
+        cleanup_upload_sessions(db)
+
+    referenced = referenced_paths(db)
+    variant_stems = {variant_stem_for(path) for path in referenced_sources(db)}
+    cutoff = time.time() - grace_hours * 3600
+
+    removed = []
+    for directory in GC_DIRS:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name).replace(os.sep, "/")
+                if path in referenced:
+                    continue
+                variant = VARIANT_NAME.fullmatch(path)
+                if variant and variant.group(1) in variant_stems:
+                    continue
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                    if not dry_run:
+                        os.remove(path)
+                except OSError:
+                    continue
+                removed.append(path)
+
+    if not dry_run:
+        # Записи о файлах, которых больше нет на диске
+        for blob in db.query(MediaBlob).filter(MediaBlob.ref_count == 0):
+            if not os.path.exists(blob.path):
+                db.delete(blob)
+        db.commit()
+    return removed
+
+def _with_session(job, *args):
+    db = SessionLocal()
+    try:
+        return job(db, *args)
+    finally:
+        db.close()
+
+async def cleanup_loop():
+    """
+    Фоновая очистка: отложенные удаления — каждые CLEANUP_INTERVAL_SECONDS,
+    поиск потерянных файлов — раз в ORPHAN_GC_INTERVAL_HOURS,
+    обслуживание базы (optimize_database) — раз в DB_MAINTENANCE_INTERVAL_HOURS
+    """
+    last_gc = last_maintenance = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.CLEANUP_INTERVAL_SECONDS)
+        try:
+            swept = await run_in_threadpool(_with_session, sweep_pending_deletions)
+            if swept:
+                logger.info("Удалено файлов из очереди удаления: %d", swept)
+            if time.monotonic() - last_gc >= settings.ORPHAN_GC_INTERVAL_HOURS * 3600:
+                last_gc = time.monotonic()
+                removed = await run_in_threadpool(_with_session, collect_garbage)
+                if removed:
+                    logger.info("Удалено потерянных файлов: %d", len(removed))
+            if time.monotonic() - last_maintenance >= settings.DB_MAINTENANCE_INTERVAL_HOURS * 3600:
+                last_maintenance = time.monotonic()
+                await run_in_threadpool(optimize_database)
+        except Exception:
+            logger.exception("Ошибка фоновой очистки загрузок")
+
+def start_cleanup():
+    """Запускает фоновую очистку в текущем цикле событий"""
+    global _task
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(cleanup_loop())
+
+def stop_cleanup():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
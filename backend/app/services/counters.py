@@ -0,0 +1,57 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.category_count import CategoryCount
+from app.models.gallery import Gallery
+from app.models.product import Product
+from app.models.project import Project
+
+# Тип записи в category_counts -> модель (счетчики ведут триггеры миграции 0006)
+COUNTED_MODELS = {
+    "product": Product,
+    "gallery": Gallery,
+    "project": Project,
+}
+
+async def category_counts(db: AsyncSession, entity_type: str, status: Optional[str] = "active") -> List[Tuple[str, int]]:
+    """Категории и количество записей в них из таблицы счетчиков; status=None — по всем статусам"""
+    query = (select(CategoryCount.category, func.sum(CategoryCount.count).label("count"))
+             .where(CategoryCount.entity_type == entity_type, CategoryCount.count > 0)
+             .group_by(CategoryCount.category).order_by(CategoryCount.category))
+    if status is not None:
+        query = query.where(CategoryCount.status == status)
+    return [(row.category, row.count) for row in (await db.execute(query)).all()]
+
+def _actual_counts(model, entity_type: str):
+    status = func.coalesce(model.status, "")
+    return (select(literal(entity_type).label("entity_type"), model.category.label("category"),
+                   status.label("status"), func.count().label("count"))
+            .where(model.category.isnot(None)).group_by(model.category, status))
+
+def check_category_counts(db: Session, fix: bool = False) -> List[Tuple[str, str, str, int, int]]:
+    """
+    Сверяет счетчики с таблицами. Возвращает расхождения (тип, категория, статус, в счетчиках, на самом деле);
+    fix=True пересчитывает все счетчики заново в одной транзакции
+    """
+    stored = {(row.entity_type, row.category, row.status): row.count
+              for row in db.execute(select(CategoryCount)).scalars()}
+    actual = {}
+    for entity_type, model in COUNTED_MODELS.items():
+        for row in db.execute(_actual_counts(model, entity_type)).all():
+            actual[(row.entity_type, row.category, row.status)] = row.count
+
+    mismatches = [(*key, stored.get(key, 0), actual.get(key, 0))
+                  for key in sorted(stored.keys() | actual.keys())
+                  if stored.get(key, 0) != actual.get(key, 0)]
+
+    if fix and mismatches:
+        db.execute(delete(CategoryCount))
+        for entity_type, model in COUNTED_MODELS.items():
+            db.execute(insert(CategoryCount).from_select(
+                ["entity_type", "category", "status", "count"], _actual_counts(model, entity_type)
+            ))
+        db.commit()
+    return mismatches
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, String, case, cast, func, literal, null, or_, select, true, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.pagination import SortKey
+from app.core.types import json_contains
+
+class Facet:
+    """
+    Фасет списка: колонка, по значениям которой считаются количества.
+    array=True — колонка JSON-массив (например, technologies), каждый элемент считается отдельным значением.
+    """
+
+    def __init__(self, name: str, column, array: bool = False):
+        self.name = name
+        self.column = column
+        self.array = array
+
+    def condition(self, values: Sequence[str]):
+        """Выбор внутри фасета — "любое из значений" """
+        if self.array:
+            return or_(*[json_contains(self.column, value) for value in values])
+        return self.column.in_(values)
+
+def _array_elements(column, dialect: str):
+    """Табличная функция "элементы JSON-массива"; строки с некорректным JSON или не массивом пропускаются"""
+    if dialect == "postgresql":
+        return func.jsonb_array_elements_text(
+            case((func.jsonb_typeof(column) == "array", column))
+        ).table_valued("value")
+    # json_type по некорректному JSON прервал бы весь запрос, поэтому сначала json_valid
+    array = case((func.json_valid(column), case((func.json_type(column) == "array", column))))
+    return func.json_each(array).table_valued("value")
+
+def _counts(model, facet: Facet, conditions: list, dialect: str):
+    """Количества по значениям фасета; выбор в самом фасете не учитывается, чтобы были видны альтернативы"""
+    if facet.array:
+        elements = _array_elements(facet.column, dialect)
+        value = cast(elements.c.value, String)
+        return (select(literal(facet.name).label("facet"), value.label("value"),
+                       func.count(model.id.distinct()).label("count"))
+                .select_from(model).join(elements, true()).where(*conditions).group_by(value))
+    return (select(literal(facet.name).label("facet"), cast(facet.column, String).label("value"),
+                   func.count().label("count"))
+            .where(facet.column.isnot(None), *conditions).group_by(facet.column))
+
+async def faceted_list(db: AsyncSession, model, facets: Sequence[Facet], selection: Dict[str, List[str]],
+                       order: SortKey, limit: int, skip: int = 0,
+                       ) -> Tuple[List, int, Dict[str, List[dict]]]:
+    """
+    Страница списка, общее количество и количества по всем значениям фасетов под текущим выбором —
+    одним запросом к базе: подзапрос со всеми количествами (UNION ALL, свернутый в один JSON)
+    соединяется со страницей через LEFT JOIN, поэтому результат есть и при пустой странице.
+    Внутри фасета значения объединяются через "или", между фасетами — через "и".
+    """
+    dialect = db.get_bind().dialect.name
+    selection = {name: values for name, values in selection.items() if values}
+    selected = {facet.name: facet.condition(selection[facet.name]) for facet in facets if facet.name in selection}
+    conditions = list(selected.values())
+
+    # Строка с пустым фасетом — общее количество под полным выбором
+    branches = [select(literal("").label("facet"), cast(null(), String).label("value"),
+                       func.count().label("count")).select_from(model).where(*conditions)]
+    for facet in facets:
+        others = [condition for name, condition in selected.items() if name != facet.name]
+        branches.append(_counts(model, facet, others, dialect))
+    counts = union_all(*branches).subquery("facet_counts")
+
+    if dialect == "postgresql":
+        packed = func.json_agg(func.json_build_array(counts.c.facet, counts.c.value, counts.c.count))
+    else:
+        packed = func.json_group_array(func.json_array(counts.c.facet, counts.c.value, counts.c.count))
+    summary = select(type_coerce(packed, JSON).label("facets")).subquery("facet_summary")
+
+    sort = [column.desc() if descending else column for column, descending in order]
+    page = select(model).where(*conditions).order_by(*sort).limit(limit).offset(skip).subquery("page")
+    item = aliased(model, page)
+    item_sort = [getattr(item, column.key).desc() if descending else getattr(item, column.key)
+                 for column, descending in order]
+
+    rows = (await db.execute(
+        select(summary.c.facets, item).select_from(summary).outerjoin(page, true()).order_by(*item_sort)
+    )).all()
+
+    total, values = 0, {facet.name: [] for facet in facets}
+    for name, value, count in rows[0].facets if rows else []:
+        if name == "":
+            total = count
+        else:
+            values[name].append({"value": value, "count": count, "selected": value in selection.get(name, [])})
+    for facet in facets:
+        # Выбранное значение остается в списке, даже если под остальными фильтрами ничего не нашлось
+        present = {entry["value"] for entry in values[facet.name]}
+        values[facet.name] += [{"value": value, "count": 0, "selected": True}
+                               for value in selection.get(facet.name, []) if value not in present]
+        values[facet.name].sort(key=lambda entry: (-entry["count"], entry["value"]))
+
+    items = [row[1] for row in rows if row[1] is not None]
+    return items, total, values
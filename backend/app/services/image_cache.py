@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.services.images import get_pool, render_resized
+
+class ImageCache:
+    """
+    Дисковый кэш уменьшенных изображений с ограничением размера.
+    При переполнении удаляются давно не запрашивавшиеся файлы (LRU),
+    кроме тех, что сейчас отдаются клиентам (закреплены до release).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # путь -> размер, от старых к новым
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pins: Dict[str, int] = {}  # путь -> сколько ответов его сейчас отдают
+        self._load()
+
+    def _load(self):
+        """Восстанавливает индекс по файлам на диске (порядок — по времени последнего доступа)"""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_atime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _path_for(self, key: str, fmt: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.{fmt}")
+
+    def _touch(self, path: str) -> bool:
+        if path not in self._entries:
+            return False
+        if not os.path.exists(path):
+            self.total_bytes -= self._entries.pop(path)
+            return False
+        self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def _add(self, path: str):
+        size = os.path.getsize(path)
+        self.total_bytes += size - self._entries.pop(path, 0)
+        self._entries[path] = size
+        self._evict(keep=path)
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for path in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            # Закрепленный файл еще отдается: удаление оборвало бы ответ (на Windows — не удалось бы вовсе)
+            if path == keep or self._pins.get(path):
+                continue
+            self.total_bytes -= self._entries.pop(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _pin(self, path: str) -> str:
+        self._pins[path] = self._pins.get(path, 0) + 1
+        return path
+
+    def release(self, path: str):
+        """Снимает закрепление после отдачи файла; отложенное вытеснение выполняется сейчас"""
+        count = self._pins.get(path, 0) - 1
+        if count > 0:
+            self._pins[path] = count
+            return
+        self._pins.pop(path, None)
+        self._evict()
+
+    async def get_or_render(self, source: str, width: Optional[int], height: Optional[int],
+                            fmt: str, quality: int) -> str:
+        """
+        Возвращает путь к готовому варианту изображения, закрепленный от вытеснения:
+        после отдачи файла вызывающий обязан вызвать release(path).
+        Одновременные запросы одного и того же варианта ждут одного кодирования.
+        """
+        # mtime в ключе: при замене исходного файла старые варианты просто перестают запрашиваться
+        key = f"{source}:{os.path.getmtime(source)}:{width}:{height}:{fmt}:{quality}"
+        path = self._path_for(key, fmt)
+        if self._touch(path):
+            return self._pin(path)
+
+        pending = self._inflight.get(path)
+        if pending is not None:
+            return self._pin(await asyncio.shield(pending))
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[path] = future
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            await loop.run_in_executor(get_pool(), render_resized, source, path, width, height, fmt, quality)
+            self._add(path)
+            self._pin(path)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Ошибку получит инициатор, ожидающих запросов может и не быть
+            raise
+        finally:
+            del self._inflight[path]
+        future.set_result(path)
+        return path
+
+_cache: Optional[ImageCache] = None
+
+def get_image_cache() -> ImageCache:
+    """Кэш изображений приложения (создается при первом обращении)"""
+    global _cache
+    if _cache is None:
+        _cache = ImageCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
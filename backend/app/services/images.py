@@ -0,0 +1,347 @@
+import base64
+import io
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from PIL import Image, ImageCms, ImageOps
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.gallery import Gallery
+from app.models.media import MediaBlob
+from app.models.product import Product
+from app.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+# Защита от "декомпрессионных бомб": Pillow откажется декодировать изображение больше лимита
+Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
+
+THUMBNAIL_DIR = "uploads/thumbnails"
+VARIANTS_DIR = "uploads/variants"
+
+# Модель -> (колонка с исходным изображением, колонка с миниатюрой, колонка с вариантами)
+IMAGE_TARGETS = {
+    Gallery: ("image_path", "thumbnail_path", "image_variants"),
+    Product: ("image_path", "thumbnail_path", "image_variants"),
+    Project: ("main_image_path", "thumbnail_path", "image_variants"),
+}
+
+# Параметры кодирования для форматов вариантов
+VARIANT_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+}
+
+# Форматы, которые при загрузке пересохраняются без метаданных (остальные только проверяются)
+SANITIZE_SAVE_OPTIONS = {
+    "JPEG": {"quality": 90, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 90, "method": 4},
+}
+
+# Ключи метаданных, ради удаления которых файл стоит переписать
+METADATA_KEYS = ("exif", "icc_profile", "xmp", "XML:com.adobe.xmp", "photoshop", "comment")
+
+_SRGB_PROFILE = ImageCms.createProfile("sRGB")
+
+class ImageRejected(ValueError):
+    """Изображение не прошло проверку при загрузке"""
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> ProcessPoolExecutor:
+    """Пул процессов для обработки изображений (создается при первом обращении)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+def shutdown_pool():
+    """Останавливает пул процессов"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def variant_formats() -> List[str]:
+    """Форматы вариантов, которые умеет сохранять установленный Pillow"""
+    Image.init()
+    return [fmt for fmt in settings.IMAGE_VARIANT_FORMATS if VARIANT_SAVE_OPTIONS[fmt]["format"] in Image.SAVE]
+
+def _derived_stem(image_path: str, root: str) -> str:
+    """uploads/gallery/a.png -> <root>/gallery/a"""
+    relative = os.path.relpath(image_path, "uploads")
+    return os.path.join(root, os.path.splitext(relative)[0]).replace(os.sep, "/")
+
+def thumbnail_path_for(image_path: str) -> str:
+    """Путь миниатюры: uploads/gallery/a.png -> uploads/thumbnails/gallery/a.jpg"""
+    return _derived_stem(image_path, THUMBNAIL_DIR) + ".jpg"
+
+def variant_stem_for(image_path: str) -> str:
+    """Общая часть имен вариантов: uploads/gallery/a.png -> uploads/variants/gallery/a"""
+    return _derived_stem(image_path, VARIANTS_DIR)
+
+def _save_atomic(img: Image.Image, destination: str, **options):
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    # Одно и то же содержимое могут обрабатывать несколько процессов одновременно
+    tmp_path = f"{destination}.{os.getpid()}.tmp"
+    img.save(tmp_path, **options)
+    os.replace(tmp_path, destination)
+
+def _to_srgb(img: Image.Image, icc_profile: Optional[bytes]) -> Image.Image:
+    """Переводит цвета в sRGB, чтобы встроенный ICC-профиль можно было отбросить"""
+    if not icc_profile or img.mode not in ("RGB", "RGBA", "CMYK"):
+        return img
+    try:
+        profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+        if "srgb" in ImageCms.getProfileDescription(profile).lower():
+            return img
+        return ImageCms.profileToProfile(img, profile, _SRGB_PROFILE, outputMode="RGBA" if img.mode == "RGBA" else "RGB")
+    except (ImageCms.PyCMSError, OSError):
+        return img
+
+def sanitize_image(path: str) -> dict:
+    """
+    Проверяет изображение по заголовку (до декодирования пикселей), применяет EXIF-поворот
+    и переписывает файл без EXIF, XMP, ICC и встроенных миниатюр.
+    Возвращает размеры, формат и признак того, что файл был переписан.
+    Выполняется в дочернем процессе.
+    """
+    with Image.open(path) as original:  # Читается только заголовок
+        width, height = original.size
+        fmt = original.format
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise ImageRejected(f"Изображение {width}x{height} превышает допустимые {settings.MAX_IMAGE_PIXELS} пикселей")
+
+        info = {"width": width, "height": height, "format": (fmt or "").lower(), "rewritten": False}
+        if fmt not in SANITIZE_SAVE_OPTIONS or getattr(original, "n_frames", 1) > 1:
+            original.verify()  # Анимации и прочие форматы не пересохраняем, только проверяем целостность
+            return info
+
+        orientation = original.getexif().get(0x0112, 1)
+        has_metadata = any(original.info.get(key) for key in METADATA_KEYS)
+        transposed = ImageOps.exif_transpose(original)
+        img = _to_srgb(transposed, original.info.get("icc_profile"))
+        options = dict(SANITIZE_SAVE_OPTIONS[fmt], format=fmt, icc_profile=None)
+        if fmt == "JPEG" and orientation == 1 and img is transposed and img.mode == original.mode:
+            # Пиксели не менялись (ни поворота, ни перевода в sRGB): сохраняем с исходными
+            # таблицами квантования, без пересжатия
+            img = original
+            options["quality"] = "keep"
+        elif fmt == "JPEG" and img.mode not in ("RGB", "L", "CMYK"):
+            img = img.convert("RGB")
+
+        tmp_path = f"{path}.{os.getpid()}.clean"
+        try:
+            img.save(tmp_path, **options)
+            if orientation == 1 and not has_metadata and os.path.getsize(tmp_path) >= os.path.getsize(path):
+                os.remove(tmp_path)  # Убирать нечего, а исходный файл и так меньше
+            else:
+                os.replace(tmp_path, path)
+                info.update(width=img.width, height=img.height, rewritten=True)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return info
+
+def render_image(source: str, thumbnail_size: int, widths: List[int], formats: List[str]) -> dict:
+    """
+    Создает миниатюру и набор вариантов разной ширины из одного декодирования.
+    Выполняется в дочернем процессе.
+    """
+    with Image.open(source) as original:
+        img = ImageOps.exif_transpose(original)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+    # Варианты шире оригинала не создаем, но хотя бы один вариант нужен всегда
+    target_widths = sorted({w for w in widths if w < img.width} or {img.width})
+    stem = variant_stem_for(source)
+
+    variants = []
+    for width in target_widths:
+        height = round(img.height * width / img.width)
+        resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            destination = f"{stem}_{width}.{fmt}"
+            _save_atomic(resized, destination, **VARIANT_SAVE_OPTIONS[fmt])
+            variants.append({"url": f"/{destination}", "width": width, "height": height, "format": fmt})
+
+    thumbnail = img.convert("RGB")
+    thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+    thumbnail_path = thumbnail_path_for(source)
+    _save_atomic(thumbnail, thumbnail_path, format="JPEG", quality=82, optimize=True, progressive=True)
+
+    return {"thumbnail_path": thumbnail_path, "variants": variants}
+
+def render_resized(source: str, destination: str, width: Optional[int], height: Optional[int],
+                   fmt: str, quality: int) -> str:
+    """
+    Уменьшает изображение так, чтобы оно поместилось в width x height (без увеличения),
+    и сохраняет в нужном формате. Выполняется в дочернем процессе.
+    """
+    with Image.open(source) as original:
+        # width x height заданы для изображения после поворота по EXIF, а draft работает в осях файла
+        rotated = original.getexif().get(0x0112) in (5, 6, 7, 8)
+        size = original.size[::-1] if rotated else original.size
+        box = (width or size[0], height or size[1])
+        original.draft("RGB", box[::-1] if rotated else box)
+        img = ImageOps.exif_transpose(original)
+        img.thumbnail(box, Image.LANCZOS)
+
+    options = {"format": fmt.upper(), "quality": quality}
+    if fmt == "jpeg":
+        img = img.convert("RGB")
+        options.update(optimize=True, progressive=True)
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if img.mode in ("LA", "P") else "RGB")
+    _save_atomic(img, destination, **options)
+    return destination
+
+def render_preview(source: str, size: int = 20) -> dict:
+    """
+    Размеры, формат, преобладающий цвет и крошечное WebP-превью в виде data URI.
+    Выполняется в дочернем процессе.
+    """
+    with Image.open(source) as original:
+        width, height = original.size
+        fmt = (original.format or "").lower()
+        if original.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF-поворот на 90°
+            width, height = height, width
+        original.draft("RGB", (size * 8, size * 8))  # Для JPEG декодируем сразу в уменьшенном масштабе
+        img = ImageOps.exif_transpose(original).convert("RGB")
+
+    sample = img.copy()
+    sample.thumbnail((64, 64))
+    colors = sample.quantize(colors=4).convert("RGB").getcolors(64 * 64)
+    red, green, blue = max(colors)[1]
+
+    img.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    img.save(buffer, "WEBP", quality=40)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    return {
+        "width": width,
+        "height": height,
+        "format": fmt,
+        "placeholder": placeholder,
+        "dominant_color": f"#{red:02x}{green:02x}{blue:02x}",
+    }
+
+def _submit(image_path: str):
+    return get_pool().submit(
+        render_image, image_path, settings.THUMBNAIL_SIZE, settings.IMAGE_VARIANT_WIDTHS, variant_formats()
+    )
+
+def _save_result(model, row_id: int, image_path: str, result: dict):
+    """Записывает результат обработки, если изображение у записи не сменилось"""
+    db = SessionLocal()
+    try:
+        row = db.query(model).filter(model.id == row_id).first()
+        if row is None:
+            return
+        source_column, thumbnail_column, variants_column = IMAGE_TARGETS[model]
+        if getattr(row, source_column) == image_path:
+            setattr(row, thumbnail_column, result["thumbnail_path"])
+            setattr(row, variants_column, result["variants"])
+        elif model is Project and image_path in (row.gallery_images or []):
+            gallery_variants = dict(row.gallery_image_variants or {})
+            gallery_variants[image_path] = result["variants"]
+            row.gallery_image_variants = gallery_variants
+        else:
+            return
+        db.commit()
+    finally:
+        db.close()
+
+def schedule_image(model, row_id: int, image_path: Optional[str]):
+    """Ставит создание миниатюры и вариантов в очередь пула, не блокируя запрос"""
+    if not image_path or not os.path.exists(image_path):
+        return
+
+    def on_done(done):
+        try:
+            _save_result(model, row_id, image_path, done.result())
+        except Exception:
+            logger.exception("Ошибка обработки изображения %s", image_path)
+
+    _submit(image_path).add_done_callback(on_done)
+
+def derived_paths_for(image_path: str) -> List[str]:
+    """Миниатюра и все варианты, созданные из изображения"""
+    paths = [thumbnail_path_for(image_path)]
+    stem = variant_stem_for(image_path)
+    directory, name = os.path.split(stem)
+    if os.path.isdir(directory):
+        pattern = re.compile(rf"{re.escape(name)}_\d+\.({'|'.join(VARIANT_SAVE_OPTIONS)})")
+        paths += [os.path.join(directory, f).replace(os.sep, "/") for f in os.listdir(directory) if pattern.fullmatch(f)]
+    return paths
+
+def remove_derived_for(image_path: str):
+    """Удаляет миниатюру и варианты изображения"""
+    for path in derived_paths_for(image_path):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def backfill_images(db, force: bool = False) -> int:
+    """Обрабатывает изображения уже существующих записей. Возвращает количество обработанных."""
+    jobs = []
+    for model, (source_column, thumbnail_column, variants_column) in IMAGE_TARGETS.items():
+        for row in db.query(model).all():
+            image_path = getattr(row, source_column)
+            if image_path and os.path.exists(image_path):
+                thumbnail = getattr(row, thumbnail_column)
+                if force or not thumbnail or not os.path.exists(thumbnail) or not getattr(row, variants_column):
+                    jobs.append((row, image_path, _submit(image_path)))
+
+            if model is Project:
+                done = row.gallery_image_variants or {}
+                for path in row.gallery_images or []:
+                    if os.path.exists(path) and (force or path not in done):
+                        jobs.append((row, path, _submit(path)))
+
+    processed = 0
+    for row, image_path, future in jobs:
+        try:
+            result = future.result()
+        except Exception:
+            logger.exception("Ошибка обработки изображения %s", image_path)
+            continue
+        source_column, thumbnail_column, variants_column = IMAGE_TARGETS[type(row)]
+        if getattr(row, source_column) == image_path:
+            setattr(row, thumbnail_column, result["thumbnail_path"])
+            setattr(row, variants_column, result["variants"])
+        else:
+            gallery_variants = dict(row.gallery_image_variants or {})
+            gallery_variants[image_path] = result["variants"]
+            row.gallery_image_variants = gallery_variants
+        processed += 1
+    db.commit()
+    return processed
+
+def backfill_previews(db, force: bool = False) -> int:
+    """Вычисляет размеры и заглушки для уже сохраненных изображений. Возвращает количество обработанных."""
+    query = db.query(MediaBlob).filter(MediaBlob.content_type.like("image/%"))
+    if not force:
+        query = query.filter(MediaBlob.placeholder.is_(None))
+    jobs = [(blob, get_pool().submit(render_preview, blob.path)) for blob in query.all() if os.path.exists(blob.path)]
+
+    processed = 0
+    for blob, future in jobs:
+        try:
+            preview = future.result()
+        except Exception:
+            logger.exception("Ошибка создания заглушки для %s", blob.path)
+            continue
+        for field, value in preview.items():
+            setattr(blob, field, value)
+        processed += 1
+    db.commit()
+    return processed
@@ -0,0 +1,174 @@
+import html
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, Integer, String, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Типы записей в поисковом индексе (миграция 0004)
+ENTITY_TYPES = ["product", "gallery", "project"]
+
+# Маркеры подсветки: база расставляет их вокруг найденных слов, а после
+# экранирования HTML они заменяются на <mark>
+MARK_START, MARK_END = "\x02", "\x03"
+
+WORD = re.compile(r"\w+")
+
+# Стеммер Snowball для русского языка. FTS5 не умеет русскую морфологию,
+# поэтому слова запроса сводятся к основе и ищутся по префиксу: "листы" -> "лист*"
+_VOWELS = "аеиоуыэюя"
+_PERFECTIVE_GERUND = re.compile(r"(?:(?<=[ая])(?:вшись|вши|в)|ившись|ывшись|ивши|ывши|ив|ыв)$")
+_REFLEXIVE = re.compile(r"(?:ся|сь)$")
+_ADJECTIVE = (r"(?:ими|ыми|его|ого|ему|ому|ее|ие|ые|ое|ей|ий|ый|ой|ем|им|ым|ом|их|ых|ую|юю|ая|яя|ою|ею)")
+_PARTICIPLE = r"(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|ивш|ывш|ующ)"
+_ADJECTIVAL = re.compile(rf"(?:{_PARTICIPLE})?{_ADJECTIVE}$")
+_VERB = re.compile(
+    r"(?:(?<=[ая])(?:ете|йте|ешь|нно|ла|на|ли|ем|ло|но|ет|ют|ны|ть|й|л|н)"
+    r"|уйте|ейте|ила|ыла|ена|ите|или|ыли|ило|ыло|ено|ует|уют|ены|ить|ыть|ишь|ей|уй|ил|ыл|им|ым|ен|ят|ит|ыт|ую|ю)$"
+)
+_NOUN = re.compile(
+    r"(?:иями|ями|ами|ией|иям|ием|иях|ев|ов|ие|ье|еи|ии|ей|ой|ий|ям|ем|ам|ом|ах|ях|ию|ью|ия|ья|а|е|и|й|о|у|ы|ь|ю|я)$"
+)
+_SUPERLATIVE = re.compile(r"(?:ейше|ейш)$")
+_DERIVATIONAL = re.compile(r"ость?$")
+
+def _region(word: str, start: int = 0) -> int:
+    """Начало области после первого сочетания "гласная + согласная" начиная со start"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+def stem(word: str) -> str:
+    word = word.lower().replace("ё", "е")
+    rv_start = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+    r2 = max(_region(word, _region(word)) - rv_start, 0)
+
+    # Шаг 1: деепричастие, иначе возвратность и затем прилагательное/глагол/существительное
+    rv, removed = _PERFECTIVE_GERUND.subn("", rv)
+    if not removed:
+        rv = _REFLEXIVE.sub("", rv)
+        for ending in (_ADJECTIVAL, _VERB, _NOUN):
+            rv, removed = ending.subn("", rv)
+            if removed:
+                break
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+    # Шаг 3: словообразовательный суффикс только в R2
+    match = _DERIVATIONAL.search(rv)
+    if match and match.start() >= r2:
+        rv = rv[:match.start()]
+    # Шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        rv, removed = _SUPERLATIVE.subn("", rv)
+        if removed and rv.endswith("нн"):
+            rv = rv[:-1]
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return prefix + rv
+
+def fts5_query(query: str) -> Optional[str]:
+    """
+    Запрос FTS5 из пользовательской строки: все слова обязательны, каждое ищется по основе.
+    Операторы FTS5 из ввода не проходят — каждое слово берется в кавычки.
+    """
+    terms = []
+    for word in WORD.findall(query):
+        base = stem(word) if re.search("[а-яё]", word, re.IGNORECASE) else word.lower()
+        # Слишком короткая основа совпала бы с половиной словаря
+        terms.append(base if len(base) >= 2 else word.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _highlight(value: Optional[str]) -> str:
+    return html.escape(value or "").replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+_RESULT_COLUMNS = dict(entity_type=String, entity_id=Integer, title=String, snippet=String, score=Float)
+
+# Колонки search_index: entity_type, entity_id, status (не индексируются), title, description, extra.
+# Вес совпадения в названии выше, чем в описании, и выше, чем в характеристиках
+_SQLITE_SEARCH = """
+SELECT entity_type, entity_id,
+       highlight(search_index, 3, :mark_start, :mark_end) AS title,
+       snippet(search_index, -1, :mark_start, :mark_end, '…', 16) AS snippet,
+       -bm25(search_index, 0, 0, 0, 10.0, 4.0, 2.0) AS score
+FROM search_index
+WHERE search_index MATCH :query AND status = 'active' AND entity_type IN :types
+ORDER BY score DESC
+LIMIT :limit OFFSET :skip
+"""
+
+_SQLITE_COUNTS = """
+SELECT entity_type, count(*) FROM search_index
+WHERE search_index MATCH :query AND status = 'active'
+GROUP BY entity_type
+"""
+
+# ts_headline дорогой, поэтому вычисляется только для строк страницы
+_POSTGRES_SEARCH = """
+WITH page AS (
+    SELECT d.entity_type, d.entity_id, d.title, d.description, d.extra,
+           ts_rank_cd(d.document, websearch_to_tsquery('russian', :query)) AS score
+    FROM search_documents d
+    WHERE d.document @@ websearch_to_tsquery('russian', :query)
+      AND d.status = 'active' AND d.entity_type IN :types
+    ORDER BY score DESC
+    LIMIT :limit OFFSET :skip
+)
+SELECT entity_type, entity_id,
+       ts_headline('russian', title, websearch_to_tsquery('russian', :query), :title_options) AS title,
+       ts_headline('russian', concat_ws(' ', description, extra), websearch_to_tsquery('russian', :query),
+                   :snippet_options) AS snippet,
+       score
+FROM page
+ORDER BY score DESC
+"""
+
+_POSTGRES_COUNTS = """
+SELECT entity_type, count(*) FROM search_documents
+WHERE document @@ websearch_to_tsquery('russian', :query) AND status = 'active'
+GROUP BY entity_type
+"""
+
+async def search(db: AsyncSession, query: str, types: Optional[Sequence[str]] = None,
+                 limit: int = 20, skip: int = 0) -> Tuple[List[dict], Dict[str, int]]:
+    """
+    Полнотекстовый поиск по продуктам, галерее и проектам.
+    Возвращает страницу результатов (с подсветкой) и количество совпадений по каждому типу.
+    """
+    types = list(types or ENTITY_TYPES)
+    if db.get_bind().dialect.name == "postgresql":
+        search_sql, counts_sql = _POSTGRES_SEARCH, _POSTGRES_COUNTS
+        params = {
+            "query": query,
+            "title_options": f"StartSel={MARK_START}, StopSel={MARK_END}, HighlightAll=true",
+            "snippet_options": f"StartSel={MARK_START}, StopSel={MARK_END}, MaxFragments=2, MaxWords=16, MinWords=6",
+        }
+    else:
+        match = fts5_query(query)
+        if match is None:
+            return [], {}
+        search_sql, counts_sql = _SQLITE_SEARCH, _SQLITE_COUNTS
+        params = {"query": match, "mark_start": MARK_START, "mark_end": MARK_END}
+
+    statement = text(search_sql).bindparams(bindparam("types", expanding=True)).columns(**_RESULT_COLUMNS)
+    rows = (await db.execute(statement, {**params, "types": types, "limit": limit, "skip": skip})).all()
+    counts_statement = text(counts_sql).columns(entity_type=String, count=Integer)
+    counts = dict((await db.execute(counts_statement, params)).all())
+
+    results = [
+        {
+            "type": row.entity_type,
+            "id": row.entity_id,
+            "title": _highlight(row.title),
+            "snippet": _highlight(row.snippet),
+            "score": row.score,
+        }
+        for row in rows
+    ]
+    return results, counts
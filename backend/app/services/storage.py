@@ -0,0 +1,111 @@
+import os
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.types import json_contains
+from app.models.gallery import Gallery
+from app.models.media import MediaBlob
+from app.models.product import Product
+from app.models.project import Project
+from app.models.pending_deletion import PendingDeletion
+from app.services.cleanup import schedule_deletion
+
+BLOB_DIR = "uploads/blobs"
+
+def blob_path_for(sha256: str, filename: Optional[str]) -> str:
+    """uploads/blobs/ab/<sha256>.<расширение исходного файла>"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,5}", ext):
+        ext = ""
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256}{ext}"
+
+async def store_file(db: AsyncSession, tmp_path: str, sha256: str, size: int, filename: Optional[str],
+               content_type: Optional[str] = None) -> MediaBlob:
+    """
+    Переносит уже записанный временный файл в хранилище по хэшу содержимого.
+    Одинаковое содержимое хранится один раз: повторная загрузка возвращает существующий blob.
+    Счетчик ссылок не меняется — его увеличивает retain() при привязке к записи.
+    """
+    blob = await db.scalar(select(MediaBlob).where(MediaBlob.sha256 == sha256))
+    if blob is not None and os.path.exists(blob.path):
+        os.remove(tmp_path)
+        if blob.ref_count == 0:
+            # Файл снова нужен: отменяем отложенное удаление и защищаем от сборки мусора
+            await db.execute(delete(PendingDeletion).where(PendingDeletion.path == blob.path))
+            os.utime(blob.path)
+        return blob
+
+    path = blob.path if blob is not None else blob_path_for(sha256, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)  # Атомарно: файл либо целиком на месте, либо отсутствует
+    if blob is not None:
+        return blob
+
+    blob = MediaBlob(sha256=sha256, path=path, size=size, content_type=content_type, ref_count=0)
+    try:
+        # Параллельная загрузка того же содержимого могла успеть создать запись
+        async with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        blob = (await db.scalars(select(MediaBlob).where(MediaBlob.sha256 == sha256))).one()
+    return blob
+
+async def _change_ref_count(db: AsyncSession, path: str, delta: int) -> Optional[int]:
+    """
+    Меняет счетчик ссылок одним UPDATE ... RETURNING: параллельные запросы к тому же файлу
+    не теряют изменений друг друга. Возвращает новое значение или None, если строка не изменилась
+    """
+    query = update(MediaBlob).where(MediaBlob.path == path)
+    if delta < 0:
+        # Счетчик не уходит ниже нуля (повторное освобождение уже свободного файла)
+        query = query.where(MediaBlob.ref_count >= -delta)
+    return await db.scalar(query.values(ref_count=MediaBlob.ref_count + delta).returning(MediaBlob.ref_count))
+
+async def _referencing_rows(db: AsyncSession, path: str) -> int:
+    """Сколько продуктов, элементов галереи и проектов ссылаются на файл (в базе, без несохраненных изменений)"""
+    queries = [
+        select(func.count()).select_from(Product)
+        .where(or_(Product.image_path == path, json_contains(Product.images, path))),
+        select(func.count()).select_from(Gallery).where(Gallery.image_path == path),
+        select(func.count()).select_from(Project)
+        .where(or_(Project.main_image_path == path, json_contains(Project.gallery_images, path))),
+    ]
+    return sum([await db.scalar(query) for query in queries])
+
+async def retain(db: AsyncSession, path: Optional[str]):
+    """Увеличивает счетчик ссылок на файл (пути вне хранилища игнорируются)"""
+    if not path:
+        return
+    await _change_ref_count(db, path, 1)
+
+async def release(db: AsyncSession, path: Optional[str]):
+    """
+    Уменьшает счетчик ссылок. Когда ссылок не осталось, файл вместе с миниатюрой
+    и вариантами ставится в очередь на удаление (его выполнит фоновая очистка).
+    У файлов, сохраненных до появления хранилища, счетчика нет: они ставятся в очередь,
+    только если кроме освобождающей записи на них никто не ссылается.
+    Вызывается до того, как изменение освобождающей записи сохранено в базе.
+    """
+    if not path:
+        return
+    ref_count = await _change_ref_count(db, path, -1)
+    if ref_count is None:
+        if await db.scalar(select(MediaBlob.id).where(MediaBlob.path == path)) is not None:
+            return  # Счетчик уже был нулевым — файл в очереди с прошлого освобождения
+        if await _referencing_rows(db, path) > 1:
+            return
+    elif ref_count > 0:
+        return
+    schedule_deletion(db, path)
+
+async def retain_all(db: AsyncSession, paths: Optional[Iterable[str]]):
+    for path in paths or []:
+        await retain(db, path)
+
+async def release_all(db: AsyncSession, paths: Optional[Iterable[str]]):
+    for path in paths or []:
+        await release(db, path)
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.gallery import Gallery
+from app.models.media import MediaBlob
+from app.models.product import Product
+from app.models.project import Project
+from app.services.images import ImageRejected, get_pool, render_preview, sanitize_image
+from app.services.storage import store_file
+
+logger = logging.getLogger(__name__)
+
+TMP_DIR = "uploads/tmp"
+CHUNK_SIZE = 256 * 1024  # Память на одну загрузку не превышает размер чанка
+
+# Ограниченный пул потоков для дисковых операций загрузок: пакет из десятков файлов
+# не занимает все потоки сервера и не блокирует цикл событий
+_io_pool = ThreadPoolExecutor(max_workers=settings.UPLOAD_IO_WORKERS, thread_name_prefix="upload-io")
+
+async def run_io(func, *args):
+    """Выполняет блокирующую файловую операцию в пуле потоков загрузок"""
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, func, *args)
+
+# Сигнатуры форматов: (смещение, байты, MIME-тип)
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (4, b"ftypavif", "image/avif"),
+    (4, b"ftypheic", "image/heic"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),
+    (0, b"\x1a\x45\xdf\xa3", "video/webm"),
+    (4, b"ftypqt", "video/quicktime"),
+    (4, b"ftyp", "video/mp4"),
+]
+
+# Изображения, которые Pillow умеет открыть: их проверяем и очищаем от метаданных
+SANITIZED_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/avif", "image/bmp", "image/tiff"}
+
+def sniff_content_type(head: bytes) -> str:
+    """Определяет MIME-тип по первым байтам файла, а не по заголовку клиента"""
+    for offset, signature, content_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    return "application/octet-stream"
+
+def hash_file(path: str) -> str:
+    """SHA-256 файла, читаемого чанками"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class IngestedFile:
+    """Загрузка, записанная во временный файл: путь, хэш, размер и MIME-тип"""
+
+    def __init__(self, tmp_path: str, sha256: str, size: int, content_type: str, filename: Optional[str]):
+        self.tmp_path = tmp_path
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        self.filename = filename
+        self.image_info: Optional[dict] = None  # Размеры, формат и заглушка изображения
+
+    def discard(self):
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+async def ingest_upload(file: UploadFile, allowed_type: Optional[str] = None,
+                        max_bytes: Optional[int] = None) -> IngestedFile:
+    """
+    Потоково записывает загрузку во временный файл чанками фиксированного размера,
+    по пути считая SHA-256. Размер проверяется во время чтения, тип — по первым байтам.
+    allowed_type — префикс MIME-типа, например "image/".
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(dir=TMP_DIR, delete=False)
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if content_type is None:
+                content_type = sniff_content_type(chunk[:32])
+                if allowed_type and not content_type.startswith(allowed_type):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Файл должен быть изображением" if allowed_type == "image/" else "Недопустимый тип файла"
+                    )
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Размер файла не должен превышать {max_bytes // (1024 * 1024)}MB"
+                )
+            digest.update(chunk)
+            await run_io(tmp.write, chunk)
+        tmp.close()
+    except BaseException:
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+
+    if size == 0:
+        os.remove(tmp.name)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Пустой файл")
+
+    return IngestedFile(tmp.name, digest.hexdigest(), size, content_type, file.filename)
+
+async def sanitize_file(path: str, content_type: Optional[str]) -> Optional[dict]:
+    """
+    Проверяет изображение в пуле процессов и переписывает файл без метаданных.
+    Возвращает размеры и формат (None для файлов, которые не проверяются).
+    """
+    if content_type not in SANITIZED_TYPES:
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_pool(), sanitize_image, path)
+    except ImageRejected as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Не удалось прочитать изображение")
+
+async def inspect_image(path: str, content_type: Optional[str]) -> Optional[dict]:
+    """
+    Очищает изображение (см. sanitize_file) и вычисляет для него цвет и заглушку.
+    Все делается до записи в базу, чтобы не держать транзакцию открытой во время обработки.
+    """
+    info = await sanitize_file(path, content_type)
+    if info is None:
+        return None
+    try:
+        preview = await asyncio.get_running_loop().run_in_executor(get_pool(), render_preview, path)
+    except Exception:
+        logger.exception("Ошибка создания заглушки для %s", path)
+        return info
+    return {**preview, **info}
+
+def apply_image_info(blob: MediaBlob, info: Optional[dict]):
+    """Дописывает в blob размеры, формат и заглушку, которых у него еще нет"""
+    for field in ("width", "height", "format", "placeholder", "dominant_color"):
+        if info and info.get(field) is not None and getattr(blob, field) is None:
+            setattr(blob, field, info[field])
+
+async def prepare_upload(file: UploadFile, allowed_type: Optional[str] = None) -> IngestedFile:
+    """Принимает загрузку во временный файл и очищает изображение (без обращений к базе)"""
+    ingested = await ingest_upload(file, allowed_type)
+    try:
+        ingested.image_info = await inspect_image(ingested.tmp_path, ingested.content_type)
+        if ingested.image_info is not None and ingested.image_info["rewritten"]:
+            # Хранилище адресуется по очищенному содержимому
+            ingested.sha256 = await run_io(hash_file, ingested.tmp_path)
+            ingested.size = os.path.getsize(ingested.tmp_path)
+    except BaseException:
+        ingested.discard()
+        raise
+    return ingested
+
+async def store_upload(db: AsyncSession, ingested: IngestedFile) -> MediaBlob:
+    """Переносит подготовленный файл в хранилище по хэшу содержимого"""
+    try:
+        blob = await store_file(db, ingested.tmp_path, ingested.sha256, ingested.size,
+                          ingested.filename, ingested.content_type)
+    except BaseException:
+        ingested.discard()
+        raise
+    apply_image_info(blob, ingested.image_info)
+    return blob
+
+async def save_upload(db: AsyncSession, file: UploadFile, allowed_type: Optional[str] = None) -> MediaBlob:
+    """Потоково принимает загрузку и сохраняет ее в хранилище по хэшу содержимого"""
+    return await store_upload(db, await prepare_upload(file, allowed_type))
+
+class UploadResult:
+    """Итог сохранения одного файла из пакетной загрузки"""
+
+    def __init__(self, filename: Optional[str], blob: Optional[MediaBlob] = None, error: Optional[str] = None):
+        self.filename = filename
+        self.blob = blob
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.blob is not None
+
+    def to_dict(self) -> dict:
+        if self.ok:
+            return {"filename": self.filename, "status": "uploaded", "file_path": self.blob.path}
+        return {"filename": self.filename, "status": "error", "error": self.error}
+
+async def save_uploads(db: AsyncSession, files: List[UploadFile], allowed_type: Optional[str] = None) -> List[UploadResult]:
+    """
+    Принимает пакет файлов параллельно (не больше UPLOAD_BATCH_CONCURRENCY одновременно),
+    затем одним проходом записывает их в базу. Ошибка одного файла не прерывает остальные;
+    результаты идут в порядке файлов.
+    """
+    semaphore = asyncio.Semaphore(settings.UPLOAD_BATCH_CONCURRENCY)
+
+    async def prepare_one(file: UploadFile):
+        async with semaphore:
+            try:
+                return await prepare_upload(file, allowed_type)
+            except HTTPException as e:
+                return UploadResult(file.filename, error=e.detail)
+            except Exception:
+                logger.exception("Ошибка сохранения файла %s", file.filename)
+                return UploadResult(file.filename, error="Не удалось сохранить файл")
+
+    results = []
+    for prepared in await asyncio.gather(*(prepare_one(file) for file in files)):
+        if isinstance(prepared, IngestedFile):
+            prepared = UploadResult(prepared.filename, blob=await store_upload(db, prepared))
+        results.append(prepared)
+    return results
+
+def register_legacy_images(db: Session) -> int:
+    """
+    Заводит записи media_blobs для изображений, сохраненных до появления хранилища по хэшу
+    (uploads/gallery/*.jpg и т.п.). Файл остается на месте, запись получает его путь —
+    так у продуктов, галереи и проектов появляется image_meta (после backfill_previews),
+    а счетчик ссылок равен числу ссылающихся на файл записей. Возвращает количество новых записей.
+    """
+    references = Counter()
+    for image_path, images in db.query(Product.image_path, Product.images):
+        references.update([image_path, *(images or [])])
+    for (image_path,) in db.query(Gallery.image_path):
+        references[image_path] += 1
+    for main_image_path, gallery_images in db.query(Project.main_image_path, Project.gallery_images):
+        references.update([main_image_path, *(gallery_images or [])])
+
+    known_paths = {path for (path,) in db.query(MediaBlob.path)}
+    known_hashes = {sha256 for (sha256,) in db.query(MediaBlob.sha256)}
+    registered = 0
+    for path, ref_count in references.items():
+        if not path or path in known_paths or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            content_type = sniff_content_type(f.read(32))
+        if not content_type.startswith("image/"):
+            continue
+        sha256 = hash_file(path)
+        if sha256 in known_hashes:
+            # sha256 уникален: такое же содержимое уже учтено под другим путем
+            logger.info("Пропущен %s: такое же изображение уже есть в хранилище", path)
+            continue
+        db.add(MediaBlob(sha256=sha256, path=path, size=os.path.getsize(path),
+                         content_type=content_type, ref_count=ref_count))
+        known_hashes.add(sha256)
+        registered += 1
+    db.commit()
+    return registered
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Нагрузочный тест API: задержки списков под одновременными загрузками изображений.
+
+Запустите сервер (python run_server.py) и выполните:
+    python benchmark_api.py --duration 30 --readers 32 --uploaders 4
+
+Читатели по кругу запрашивают списки галереи, проектов и продуктов, загрузчики
+отправляют новые изображения. В конце печатаются p50/p95/p99 по каждому виду запросов.
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import statistics
+import time
+
+import httpx
+from PIL import Image
+
+READ_PATHS = [
+    "/api/v1/gallery/?limit=20",
+    "/api/v1/projects/?limit=20",
+    "/api/v1/products/?limit=20",
+    "/api/v1/gallery/categories",
+]
+
+def random_jpeg() -> bytes:
+    """Каждый раз новое содержимое, чтобы загрузка не совпала с уже сохраненным файлом"""
+    image = Image.new("RGB", (1200, 800), tuple(random.randrange(256) for _ in range(3)))
+    image.putpixel((random.randrange(1200), random.randrange(800)), (0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+async def reader(client: httpx.AsyncClient, deadline: float, latencies: dict, errors: list):
+    while time.monotonic() < deadline:
+        path = random.choice(READ_PATHS)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code != 200:
+                errors.append(f"GET {path}: {response.status_code}")
+        except httpx.HTTPError as e:
+            errors.append(f"GET {path}: {e!r}")
+        latencies.setdefault("read", []).append(time.perf_counter() - started)
+
+async def uploader(client: httpx.AsyncClient, deadline: float, latencies: dict, errors: list):
+    while time.monotonic() < deadline:
+        files = {"file": ("bench.jpg", random_jpeg(), "image/jpeg")}
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/products/upload-image", files=files)
+            if response.status_code != 200:
+                errors.append(f"POST upload-image: {response.status_code} {response.text[:100]}")
+        except httpx.HTTPError as e:
+            errors.append(f"POST upload-image: {e!r}")
+        latencies.setdefault("upload", []).append(time.perf_counter() - started)
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+async def run(args):
+    latencies, errors = {}, []
+    limits = httpx.Limits(max_connections=args.readers + args.uploaders)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        # Прогрев: соединения с базой и пул процессов обработки изображений
+        await client.get(READ_PATHS[0])
+
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(
+            *(reader(client, deadline, latencies, errors) for _ in range(args.readers)),
+            *(uploader(client, deadline, latencies, errors) for _ in range(args.uploaders)),
+        )
+
+    print(f"{'запросы':<8} {'всего':>7} {'rps':>7} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for kind, values in latencies.items():
+        print(f"{kind:<8} {len(values):>7} {len(values) / args.duration:>7.1f} "
+              f"{statistics.median(values) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+              f"{percentile(values, 99) * 1000:>9.1f}")
+    if errors:
+        print(f"Ошибок: {len(errors)}, например: {errors[0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержки API под смешанной нагрузкой чтения и загрузок")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="адрес запущенного сервера")
+    parser.add_argument("--duration", type=int, default=30, help="длительность в секундах")
+    parser.add_argument("--readers", type=int, default=32, help="одновременных читателей")
+    parser.add_argument("--uploaders", type=int, default=4, help="одновременных загрузчиков")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Микробенчмарк JSON-колонок: разбор страницы из 1000 продуктов (features, images,
+image_variants, specifications, detailed) старым способом (json из стандартной библиотеки)
+и через JSONType (orjson), а также размер хранимого JSON до и после миграции 0007.
+
+Использование:
+    python benchmark_json.py
+    python benchmark_json.py --rows 5000 --repeat 20
+"""
+
+import sys
+import os
+import argparse
+import json
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.dialects import sqlite
+
+from app.core.types import JSONType, json_dumps
+
+def product_columns(i: int) -> dict:
+    """JSON-колонки одного продукта, похожие на данные каталога"""
+    return {
+        "features": ["Зеркальная полировка", "PVD покрытие", "Защитная пленка", f"Партия {i}"],
+        "images": [f"uploads/products/{i}_{n}.jpg" for n in range(4)],
+        "image_variants": [
+            {"url": f"/uploads/products/{i}_{width}.webp", "width": width, "height": width * 2 // 3, "format": "webp"}
+            for width in (320, 640, 1280)
+        ],
+        "specifications": {
+            "colors": ["Золотой", "Бронзовый", "Черный"],
+            "thickness": "0.5–3.0 мм",
+            "size": "1250×2500 мм",
+            "material": "AISI 304",
+        },
+        "detailed": {
+            "description": "Нержавеющая сталь с декоративным покрытием для отделки интерьеров и фасадов",
+            "applications": ["Лифты", "Фасады", "Интерьеры"],
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость разбора JSON-колонок страницы продуктов")
+    parser.add_argument("--rows", type=int, default=1000, help="продуктов на странице")
+    parser.add_argument("--repeat", type=int, default=50, help="повторов замера")
+    args = parser.parse_args()
+
+    products = [product_columns(i) for i in range(args.rows)]
+    # Так колонки хранил старый код (ensure_ascii=True) и так — после миграции 0007
+    escaped = [{column: json.dumps(value) for column, value in row.items()} for row in products]
+    compact = [{column: json_dumps(value) for column, value in row.items()} for row in products]
+
+    column_type = JSONType()
+    dialect = sqlite.dialect()
+    process = column_type.result_processor(dialect, None)
+
+    def decode_stdlib():
+        for row in escaped:
+            for value in row.values():
+                json.loads(value)
+
+    def decode_json_type():
+        for row in compact:
+            for value in row.values():
+                process(value)
+
+    print(f"Страница: {args.rows} продуктов, {len(products[0])} JSON-колонки в каждом")
+    for name, function in (("json (стандартная библиотека)", decode_stdlib), ("JSONType (orjson)", decode_json_type)):
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print(f"{name:<32} {best * 1000:8.2f} мс на страницу")
+
+    escaped_size = sum(len(value.encode()) for row in escaped for value in row.values())
+    compact_size = sum(len(value.encode()) for row in compact for value in row.values())
+    print(f"Размер JSON: {escaped_size / 1024:.0f} КБ с \\uXXXX, {compact_size / 1024:.0f} КБ компактно в UTF-8 "
+          f"({escaped_size / compact_size:.1f}×)")
+
+if __name__ == "__main__":
+    main()
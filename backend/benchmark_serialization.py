@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк сериализации списков: страница из 1000 продуктов, галереи и проектов
+прежним путем (проверка каждой строки схемой Pydantic, затем jsonable_encoder и json.dumps
+внутри FastAPI) и через list_response (строки сразу в JSON через orjson).
+Заодно проверяется, что оба пути дают одинаковый JSON.
+
+Использование:
+    python benchmark_serialization.py
+    python benchmark_serialization.py --rows 100 --repeat 50
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.core.serialization import list_response
+from app.main import app
+from app.models.gallery import Gallery
+from app.models.media import MediaBlob
+from app.models.product import Product
+from app.models.project import Project
+from app.schemas.gallery import GalleryList
+from app.schemas.product import ProductList
+from app.schemas.project import ProjectList
+
+def variants(path: str) -> list:
+    return [{"url": f"/{path}_{width}.webp", "width": width, "height": width * 2 // 3, "format": "webp"}
+            for width in (320, 640, 1280)]
+
+def image_meta() -> MediaBlob:
+    return MediaBlob(width=1200, height=800, placeholder="data:image/webp;base64," + "A" * 120,
+                     dominant_color="#c0a060")
+
+def make_product(i: int) -> Product:
+    product = Product(
+        id=i, name=f"Лист нержавеющей стали {i}", category="Листы", description="Декоративная сталь " * 10,
+        features=["Зеркальная полировка", "PVD покрытие"], image_path=f"uploads/products/{i}.jpg",
+        thumbnail_path=f"uploads/products/thumbnails/{i}.webp", image_variants=variants(f"uploads/products/{i}"),
+        images=[f"uploads/products/{i}_{n}.jpg" for n in range(3)],
+        specifications={"type": "PVD", "thickness": "0.8 мм", "colors": ["Золотой", "Черный"], "legacy": "x"},
+        detailed={"technology": "Вакуумное напыление", "benefits": ["Прочность"]},
+        price=1250.5, status="active", created_at=datetime(2026, 10, 17, 8, 30), updated_at=datetime(2026, 10, 17, 9),
+    )
+    product.image_meta = image_meta()
+    return product
+
+def make_gallery(i: int) -> Gallery:
+    gallery = Gallery(
+        id=i, title=f"Работа {i}", description="Отделка " * 10, category="PVD покрытия", color="Золотой",
+        finish="Зеркальный", image_path=f"uploads/gallery/{i}.jpg", thumbnail_path=None,
+        image_variants=variants(f"uploads/gallery/{i}"), features=["Декоративное покрытие"], status="active",
+        sort_order=i % 5, created_at=datetime(2026, 10, 17, 8, 30), updated_at=datetime(2026, 10, 17, 9),
+    )
+    gallery.image_meta = image_meta()
+    return gallery
+
+def make_project(i: int) -> Project:
+    project = Project(
+        id=i, title=f"Проект {i}", description="Облицовка " * 10, short_description="Лифтовые кабины",
+        category="Коммерческие", client="ООО Клиент", location="Москва", area="120 м²", completion_date="2025",
+        main_image_path=f"uploads/projects/{i}.jpg", thumbnail_path=None, image_variants=variants(f"uploads/projects/{i}"),
+        gallery_images=[f"uploads/projects/gallery/{i}.jpg"],
+        gallery_image_variants={f"uploads/projects/gallery/{i}.jpg": variants(f"uploads/projects/gallery/{i}")},
+        features=["Зеркало"], technologies=["PVD", "Лазерная резка"], status="active", sort_order=0,
+        is_featured=i % 2 == 0, created_at=datetime(2026, 10, 17, 8, 30), updated_at=datetime(2026, 10, 17, 9),
+    )
+    project.image_meta = None
+    return project
+
+def response_field(path: str):
+    return next(route.response_field for route in app.routes if getattr(route, "path", None) == path
+                and "GET" in route.methods)
+
+def current_path(field, schema, items_field, items, fields) -> bytes:
+    """Как сейчас: схема из ORM-объектов, проверка response_model и jsonable_encoder"""
+    content = schema(**{items_field: items}, **fields)
+    encoded = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(encoded).body
+
+def fast_path(schema, items_field, items, fields) -> bytes:
+    return list_response(schema, items_field, items, **fields).body
+
+def best_of(repeat: int, function) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость сериализации ответов со списками")
+    parser.add_argument("--rows", type=int, default=1000, help="строк на странице")
+    parser.add_argument("--repeat", type=int, default=10, help="повторов замера")
+    args = parser.parse_args()
+
+    fields = dict(total=args.rows * 3, total_estimated=False, page=1, size=args.rows, next_cursor="abc")
+    cases = [
+        ("products", "/api/v1/products/", ProductList, make_product),
+        ("galleries", "/api/v1/gallery/", GalleryList, make_gallery),
+        ("projects", "/api/v1/projects/", ProjectList, make_project),
+    ]
+    print(f"{'список':<10} {'сейчас, мс':>11} {'orjson, мс':>11} {'ускорение':>10}")
+    for items_field, path, schema, make in cases:
+        items = [make(i) for i in range(args.rows)]
+        field = response_field(path)
+        current = current_path(field, schema, items_field, items, fields)
+        fast = fast_path(schema, items_field, items, fields)
+        if json.loads(current) != json.loads(fast):
+            print(f"{items_field}: ответы различаются!")
+
+        current_time = best_of(args.repeat, lambda: current_path(field, schema, items_field, items, fields))
+        fast_time = best_of(args.repeat, lambda: fast_path(schema, items_field, items, fields))
+        print(f"{items_field:<10} {current_time * 1000:>11.1f} {fast_time * 1000:>11.1f} "
+              f"{current_time / fast_time:>9.1f}×")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Скрипт сверки счетчиков категорий (таблица category_counts) с таблицами продуктов,
+галереи и проектов. Счетчики ведут триггеры базы; расхождения возможны, только если
+данные меняли в обход них (например, восстановлением из дампа без триггеров).
+
+Использование:
+    python check_counters.py        # показать расхождения
+    python check_counters.py --fix  # пересчитать все счетчики
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.counters import check_category_counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка и пересчет счетчиков категорий")
+    parser.add_argument("--fix", action="store_true", help="пересчитать счетчики, если есть расхождения")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        mismatches = check_category_counts(db, fix=args.fix)
+        for entity_type, category, status, stored, actual in mismatches:
+            print(f"{entity_type} / {category} / {status or '-'}: в счетчиках {stored}, на самом деле {actual}")
+        if not mismatches:
+            print("Счетчики совпадают")
+        elif args.fix:
+            print(f"Счетчики пересчитаны, исправлено расхождений: {len(mismatches)}")
+        else:
+            print(f"Расхождений: {len(mismatches)} (исправить: python check_counters.py --fix)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
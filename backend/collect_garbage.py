@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Скрипт для очистки uploads/: выполняет отложенные удаления и удаляет файлы,
+на которые не ссылается ни одна запись (то же делает фоновая очистка сервера)
+
+Использование:
+    python collect_garbage.py                  # удалить потерянные файлы старше ORPHAN_GRACE_HOURS
+    python collect_garbage.py --dry-run        # только показать, что будет удалено
+    python collect_garbage.py --grace-hours 1  # свой срок, после которого файл считается потерянным
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.cleanup import collect_garbage, sweep_pending_deletions
+
+def main():
+    parser = argparse.ArgumentParser(description="Удаление файлов, на которые не ссылаются записи")
+    parser.add_argument("--dry-run", action="store_true", help="ничего не удалять, только вывести список")
+    parser.add_argument("--grace-hours", type=int, default=None, help="не трогать файлы моложе этого срока")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not args.dry_run:
+            print(f"Выполнено отложенных удалений: {sweep_pending_deletions(db, force=True)}")
+        removed = collect_garbage(db, grace_hours=args.grace_hours, dry_run=args.dry_run)
+        for path in removed:
+            print(("Будет удален: " if args.dry_run else "Удален: ") + path)
+        print(f"Потерянных файлов: {len(removed)}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
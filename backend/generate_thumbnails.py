@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Скрипт для создания миниатюр, адаптивных вариантов (WebP/AVIF) и заглушек-превью
+у существующих записей галереи, продуктов и проектов
+(например, добавленных через add_gallery_data_inoxmetalart.py).
+Изображения, сохраненные до хранилища по хэшу, сначала получают записи media_blobs
+на месте, без переноса файлов — к ним привязываются размеры и заглушки.
+
+Использование:
+    python generate_thumbnails.py           # только для записей без миниатюры
+    python generate_thumbnails.py --force   # пересоздать все миниатюры и варианты
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.images import backfill_images, backfill_previews, shutdown_pool
+from app.services.uploads import register_legacy_images
+
+def main():
+    parser = argparse.ArgumentParser(description="Создание миниатюр и вариантов для существующих изображений")
+    parser.add_argument("--force", action="store_true", help="пересоздать уже существующие миниатюры и варианты")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        processed = backfill_images(db, force=args.force)
+        print(f"Обработано изображений: {processed}")
+        registered = register_legacy_images(db)
+        print(f"Учтено старых изображений: {registered}")
+        previews = backfill_previews(db, force=args.force)
+        print(f"Создано заглушек: {previews}")
+    finally:
+        db.close()
+        shutdown_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Скрипт для создания сжатых копий (.br и .gz) ассетов собранного фронтенда.
+Backend отдает их вместо оригиналов по заголовку Accept-Encoding (FRONTEND_DIST_DIR).
+
+Использование (после npm run build):
+    python precompress_assets.py ../frontend/dist
+"""
+
+import argparse
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него создаются только .gz
+    brotli = None
+
+COMPRESSIBLE = (".html", ".js", ".css", ".json", ".svg", ".map", ".txt", ".webmanifest", ".xml")
+MIN_SIZE = 1024  # Маленькие файлы сжимать не выгодно
+
+def precompress(directory: str) -> int:
+    """Создает сжатые копии рядом с файлами. Возвращает количество обработанных файлов."""
+    processed = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+
+            with open(path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            processed += 1
+            print(f"Сжат файл: {path}")
+    return processed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Создание .br/.gz копий ассетов фронтенда")
+    parser.add_argument("directory", nargs="?", default="../frontend/dist", help="папка собранного фронтенда")
+    args = parser.parse_args()
+
+    count = precompress(args.directory)
+    if brotli is None:
+        print("Модуль brotli не установлен — созданы только .gz файлы (pip install brotli)")
+    print(f"Обработано файлов: {count}")
@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import uvicorn
-from app.main import app
+from alembic import command
+from alembic.config import Config
+
+def upgrade_database():
+    """Применяет миграции схемы (то же, что alembic upgrade head)"""
+    command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")), "head")
 
 if __name__ == "__main__":
+    upgrade_database()
+    
     print("Запускаем сервер Inox Metal Art API...")
     print("Сервер будет доступен по адресу: http://127.0.0.1:8000")
     print("Документация API: http://127.0.0.1:8000/docs")
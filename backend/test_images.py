@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты очистки загруженных изображений от метаданных.
+Запуск: python -m pytest test_images.py или python test_images.py
+"""
+
+import os
+import struct
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix="inox_images_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/test.db")
+
+from PIL import Image, ImageCms  # noqa: E402
+
+from app.services.images import sanitize_image  # noqa: E402
+
+# Основные цвета sRGB в XYZ (D50)
+SRGB_RED = (0.4361, 0.2225, 0.0139)
+SRGB_GREEN = (0.3851, 0.7169, 0.0971)
+SRGB_BLUE = (0.1431, 0.0606, 0.7141)
+D50 = (0.9642, 1.0, 0.8249)
+
+def _icc_profile(description: str, red, green, blue) -> bytes:
+    """Минимальный матричный RGB-профиль ICC v2 с гаммой 2.2"""
+    def xyz(values):
+        return b"XYZ \0\0\0\0" + b"".join(struct.pack(">i", round(v * 65536)) for v in values)
+
+    curve = b"curv\0\0\0\0" + struct.pack(">IH", 1, round(2.2 * 256)) + b"\0\0"
+    text = description.encode("ascii") + b"\0"
+    desc = b"desc\0\0\0\0" + struct.pack(">I", len(text)) + text + struct.pack(">II", 0, 0) + b"\0" * 70
+    tags = [(b"desc", desc), (b"wtpt", xyz(D50)), (b"rXYZ", xyz(red)), (b"gXYZ", xyz(green)),
+            (b"bXYZ", xyz(blue)), (b"rTRC", curve), (b"gTRC", curve), (b"bTRC", curve)]
+
+    offset = 128 + 4 + 12 * len(tags)
+    table, data = struct.pack(">I", len(tags)), b""
+    for signature, body in tags:
+        body += b"\0" * (-len(body) % 4)
+        table += signature + struct.pack(">II", offset + len(data), len(body))
+        data += body
+    header = (struct.pack(">I", offset + len(data)) + b"\0" * 4 + struct.pack(">I", 0x02100000)
+              + b"mntrRGB XYZ " + b"\0" * 12 + b"acsp" + b"\0" * 28
+              + b"".join(struct.pack(">i", round(v * 65536)) for v in D50) + b"\0" * 48)
+    return header + table + data
+
+def _jpeg(name: str, color, icc_profile: bytes) -> str:
+    path = os.path.join(WORK_DIR, name)
+    Image.new("RGB", (64, 64), color).save(path, quality=95, icc_profile=icc_profile)
+    return path
+
+def test_sanitize_converts_non_srgb_profile():
+    # Красный и зеленый переставлены: после перевода в sRGB красный пиксель станет зеленым
+    profile = _icc_profile("Swapped RG", SRGB_GREEN, SRGB_RED, SRGB_BLUE)
+    path = _jpeg("swapped.jpg", (255, 0, 0), profile)
+
+    info = sanitize_image(path)
+    assert info["rewritten"]
+    with Image.open(path) as img:
+        assert not img.info.get("icc_profile")
+        r, g, b = img.getpixel((32, 32))
+    assert r < 40 and g > 215 and b < 40
+
+def test_sanitize_keeps_srgb_pixels():
+    profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    path = _jpeg("srgb.jpg", (255, 0, 0), profile)
+
+    sanitize_image(path)
+    with Image.open(path) as img:
+        assert not img.info.get("icc_profile")
+        r, g, b = img.getpixel((32, 32))
+    assert r > 215 and g < 40 and b < 40
+
+if __name__ == "__main__":
+    test_sanitize_converts_non_srgb_profile()
+    test_sanitize_keeps_srgb_pixels()
+    print("✅ test_images: все тесты пройдены")
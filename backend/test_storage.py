@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты счетчика ссылок хранилища и отложенного удаления файлов.
+Запуск: python -m pytest test_storage.py или python test_storage.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+# База и файлы во временном каталоге: приложение работает с путями uploads/... от текущего каталога
+WORK_DIR = tempfile.mkdtemp(prefix="inox_storage_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/test.db")
+os.chdir(WORK_DIR)
+
+from app.core.database import AsyncSessionLocal, Base, SessionLocal, async_engine, async_read_engine, engine  # noqa: E402
+from app.models.gallery import Gallery  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.pending_deletion import PendingDeletion  # noqa: E402
+from app.services.cleanup import schedule_deletion, sweep_pending_deletions  # noqa: E402
+from app.services.storage import release  # noqa: E402
+import app.main  # noqa: E402,F401  регистрирует все модели
+
+Base.metadata.create_all(engine)
+
+def _legacy_file(name: str) -> str:
+    """Файл, сохраненный до появления хранилища: записи в media_blobs нет"""
+    path = f"uploads/gallery/{name}"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"legacy")
+    return path
+
+def _add_gallery(path: str) -> int:
+    with SessionLocal() as db:
+        item = Gallery(title="PVD золото", category="PVD покрытия", image_path=path)
+        db.add(item)
+        db.commit()
+        return item.id
+
+async def _delete_gallery(item_id: int):
+    """Как DELETE /gallery/{id}: освобождение файла до удаления записи"""
+    async with AsyncSessionLocal() as db:
+        item = await db.get(Gallery, item_id)
+        await release(db, item.image_path)
+        await db.delete(item)
+        await db.commit()
+    # Соединения aiosqlite держат потоки, которые не дают процессу завершиться
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+def _pending(path: str) -> int:
+    with SessionLocal() as db:
+        return db.query(PendingDeletion).filter(PendingDeletion.path == path).count()
+
+def _sweep():
+    with SessionLocal() as db:
+        sweep_pending_deletions(db, force=True)
+
+def test_release_keeps_shared_legacy_file():
+    path = _legacy_file("pvd_gold.jpg")
+    first, second = _add_gallery(path), _add_gallery(path)
+
+    asyncio.run(_delete_gallery(first))
+    assert _pending(path) == 0
+    _sweep()
+    assert os.path.exists(path)
+
+    asyncio.run(_delete_gallery(second))
+    assert _pending(path) == 1
+    _sweep()
+    assert not os.path.exists(path)
+
+def test_sweep_keeps_referenced_legacy_file():
+    path = _legacy_file("pvd_bronze.jpg")
+    _add_gallery(path)
+    with SessionLocal() as db:
+        db.add(Product(name="Лист PVD бронза", category="Листы", image_path=path))
+        schedule_deletion(db, path)  # Очередь, оставшаяся от прежних версий
+        db.commit()
+
+    _sweep()
+    assert _pending(path) == 0
+    assert os.path.exists(path)
+
+if __name__ == "__main__":
+    test_release_keeps_shared_legacy_file()
+    test_sweep_keeps_referenced_legacy_file()
+    print("✅ test_storage: все тесты пройдены")
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Image, Loader2 } from 'lucide-react';
+import { imageOptimization, ImageMeta, ImageVariant } from '../../utils/imageOptimization';
 
 interface LazyImageProps {
   src: string;
@@ -8,6 +9,10 @@ interface LazyImageProps {
   className?: string;
   placeholder?: string;
   fallback?: string;
+  variants?: ImageVariant[];
+  variantBaseUrl?: string;
+  sizes?: string;
+  meta?: ImageMeta | null;
   onLoad?: () => void;
   onError?: () => void;
 }
@@ -18,6 +23,10 @@ const LazyImage: React.FC<LazyImageProps> = ({
   className = '',
   placeholder = '',
   fallback = '',
+  variants = [],
+  variantBaseUrl = '',
+  sizes = '100vw',
+  meta = null,
   onLoad,
   onError
 }) => {
@@ -59,12 +68,31 @@ const LazyImage: React.FC<LazyImageProps> = ({
   };
 
   const imageSrc = hasError ? fallback : src;
+  const sources = hasError ? [] : imageOptimization.getVariantSources(variants, variantBaseUrl);
+  // Blurred preview from the API replaces the spinner and keeps the layout stable
+  const hasPreview = Boolean(meta?.placeholder || meta?.dominant_color);
+  const containerStyle: React.CSSProperties = {
+    backgroundColor: meta?.dominant_color ?? undefined,
+    aspectRatio: meta?.width && meta?.height ? `${meta.width} / ${meta.height}` : undefined
+  };
 
   return (
-    <div ref={containerRef} className={`relative overflow-hidden ${className}`}>
+    <div ref={containerRef} className={`relative overflow-hidden ${className}`} style={containerStyle}>
       <AnimatePresence mode="wait">
+        {/* Blurred preview */}
+        {!isLoaded && meta?.placeholder && (
+          <motion.img
+            src={meta.placeholder}
+            alt=""
+            aria-hidden="true"
+            initial={{ opacity: 1 }}
+            exit={{ opacity: 0 }}
+            className="absolute inset-0 w-full h-full object-cover blur-lg scale-110"
+          />
+        )}
+
         {/* Loading State */}
-        {!isLoaded && isInView && (
+        {!isLoaded && isInView && !hasPreview && (
           <motion.div
             initial={{ opacity: 1 }}
             exit={{ opacity: 0 }}
@@ -78,7 +106,7 @@ const LazyImage: React.FC<LazyImageProps> = ({
         )}
 
         {/* Placeholder */}
-        {!isInView && placeholder && (
+        {!isInView && placeholder && !hasPreview && (
           <motion.div
             initial={{ opacity: 1 }}
             exit={{ opacity: 0 }}
@@ -93,17 +121,24 @@ const LazyImage: React.FC<LazyImageProps> = ({
 
         {/* Actual Image */}
         {isInView && (
-          <motion.img
-            ref={imgRef}
-            src={imageSrc}
-            alt={alt}
-            className={`w-full h-full object-cover transition-opacity duration-300 ${
-              isLoaded ? 'opacity-100' : 'opacity-0'
-            }`}
-            onLoad={handleLoad}
-            onError={handleError}
-            loading="lazy"
-          />
+          <picture>
+            {sources.map(source => (
+              <source key={source.type} type={source.type} srcSet={source.srcSet} sizes={sizes} />
+            ))}
+            <motion.img
+              ref={imgRef}
+              src={imageSrc}
+              alt={alt}
+              width={meta?.width ?? undefined}
+              height={meta?.height ?? undefined}
+              className={`w-full h-full object-cover transition-opacity duration-300 ${
+                isLoaded ? 'opacity-100' : 'opacity-0'
+              }`}
+              onLoad={handleLoad}
+              onError={handleError}
+              loading="lazy"
+            />
+          </picture>
         )}
       </AnimatePresence>
     </div>
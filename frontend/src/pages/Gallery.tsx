@@ -2,6 +2,8 @@ import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { Grid, List, Palette, FileText, Star, Brush, Zap } from 'lucide-react';
 import Button from '../components/ui/Button';
+import LazyImage from '../components/ui/LazyImage';
+import { ImageMeta, ImageVariant } from '../utils/imageOptimization';
 
 interface GalleryItem {
   id: number;
@@ -14,6 +16,8 @@ interface GalleryItem {
   price_unit: string;
   features: string[];
   image_path: string | null;
+  image_variants: ImageVariant[];
+  image_meta: ImageMeta | null;
   status: string;
 }
 
@@ -206,10 +210,14 @@ const Gallery: React.FC = () => {
                 {/* Image */}
                 <div className={`${viewMode === 'list' ? 'w-48 h-32' : 'aspect-video'} bg-gray-100 flex items-center justify-center`}>
                   {item.image_path ? (
-                    <img
+                    <LazyImage
                       src={`http://localhost:8000/${item.image_path}`}
                       alt={item.title}
-                      className="w-full h-full object-cover"
+                      variants={item.image_variants}
+                      meta={item.image_meta}
+                      variantBaseUrl="http://localhost:8000"
+                      sizes={viewMode === 'list' ? '192px' : '(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw'}
+                      className="w-full h-full"
                     />
                   ) : (
                     <div className="w-16 h-16 bg-gray-200 rounded-full flex items-center justify-center">
@@ -1,3 +1,19 @@
+// Image variant returned by the API (see ImageVariant in backend schemas)
+export interface ImageVariant {
+  url: string;
+  width: number;
+  height: number;
+  format: string;
+}
+
+// Image metadata returned by the API (see ImageMeta in backend schemas)
+export interface ImageMeta {
+  width: number | null;
+  height: number | null;
+  placeholder: string | null;
+  dominant_color: string | null;
+}
+
 // Image optimization utilities
 export const imageOptimization = {
   // Generate responsive image sizes
@@ -15,6 +31,31 @@ export const imageOptimization = {
       .join(', ');
   },
 
+  // Generate srcset from API image variants of a single format
+  buildVariantSrcSet: (variants: ImageVariant[], format: string, baseUrl = '') => {
+    return variants
+      .filter(variant => variant.format === format)
+      .sort((a, b) => a.width - b.width)
+      .map(variant => `${baseUrl}${variant.url} ${variant.width}w`)
+      .join(', ');
+  },
+
+  // Group API image variants into <picture> sources, best format first
+  getVariantSources: (variants: ImageVariant[], baseUrl = '') => {
+    return ['avif', 'webp']
+      .map(format => ({
+        type: `image/${format}`,
+        srcSet: imageOptimization.buildVariantSrcSet(variants, format, baseUrl)
+      }))
+      .filter(source => source.srcSet);
+  },
+
+  // URL of an upload resized on the fly by the backend (/img route)
+  getResizedUrl: (imagePath: string, width: number, format = 'webp', baseUrl = '') => {
+    const path = imagePath.replace(/^\/?uploads\//, '');
+    return `${baseUrl}/img/${path}?w=${width}&fmt=${format}`;
+  },
+
   // Lazy loading threshold
   lazyLoadThreshold: 50,
 